@@ -1,3 +1,21 @@
 import os
 
 DISCORD_TOKEN_SSM_PATH = os.getenv("DISCORD_TOKEN_SSM_PATH", "/skinsbot/discord_token")
+
+# Total number of shards the bot is split into. Each invocation runs the shards
+# given in its event ({"shard_ids": [...]}) or in SHARD_IDS (e.g. "0,1").
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+SHARD_IDS = [int(i) for i in os.getenv("SHARD_IDS", "").split(",") if i.strip()]
+
+# CS2 market hash names refreshed by workers/item_names.py, used for fuzzy
+# matching of skin names. ITEM_NAMES_FILE is bundled at deploy time.
+ITEM_NAMES_BUCKET = os.getenv("ITEM_NAMES_BUCKET")
+ITEM_NAMES_KEY = os.getenv("ITEM_NAMES_KEY", "skinsbot/item_names/item_names.txt")
+ITEM_NAMES_FILE = os.path.join(os.path.dirname(__file__), "data", "item_names.txt")
+
+# Prefix commands ("->add_skin") need the privileged message_content intent
+ENABLE_PREFIX_COMMANDS = os.getenv("ENABLE_PREFIX_COMMANDS", "true").lower() == "true"
+
+# Prices refreshed longer ago than this are shown as unavailable, in broadcasts
+# and portfolios alike
+MAX_PRICE_AGE_SECONDS = 24 * 3600
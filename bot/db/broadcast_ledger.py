@@ -0,0 +1,187 @@
+import asyncio
+import logging
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from db.exceptions import BroadcastAlreadyClaimedError
+from models.result import Result
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+dynamodb_client = boto3.resource("dynamodb")
+# pk: broadcast_date (YYYY-MM-DD), sk: guild_id
+broadcast_ledger_table = dynamodb_client.Table("skinsbot.broadcast_ledger")
+
+LEDGER_TTL_SECONDS = 7 * 24 * 3600
+STATUS_CLAIMED = "claimed"
+# terminal statuses: the guild is settled for the day
+STATUS_SENT = "sent"
+STATUS_NO_CHANNEL = "no_channel"  # no update channel set
+STATUS_UNREACHABLE = "unreachable"  # channel deleted or missing permissions
+
+
+def get_settled_guild_ids_or_raise(broadcast_date: str, unix_now: int) -> set[int]:
+    """
+    Guilds that don't need the update of `broadcast_date`: settled (sent, no
+    channel or unreachable channel), or claimed by a process whose claim hasn't
+    expired. A single query reads the
+    whole day (one row per guild, a few dozen bytes each).
+    """
+    settled = set()
+    kwargs = {
+        "KeyConditionExpression": Key("broadcast_date").eq(broadcast_date),
+        "ProjectionExpression": "guild_id, #status, claim_expires",
+        "ExpressionAttributeNames": {"#status": "status"},
+    }
+    while True:
+        response = broadcast_ledger_table.query(**kwargs)
+        for item in response.get("Items", []):
+            if item["status"] != STATUS_CLAIMED or item["claim_expires"] > unix_now:
+                settled.add(int(item["guild_id"]))
+        if not response.get("LastEvaluatedKey"):
+            return settled
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def claim_guild_or_raise(
+    broadcast_date: str,
+    guild_id: int,
+    owner: str,
+    unix_now: int,
+    claim_expires: int,
+) -> None:
+    """
+    Claim the update of `guild_id` before sending it. The write only succeeds if
+    the guild isn't settled and nobody else holds an unexpired claim.
+    """
+    try:
+        broadcast_ledger_table.put_item(
+            Item={
+                "broadcast_date": broadcast_date,
+                "guild_id": guild_id,
+                "status": STATUS_CLAIMED,
+                "owner": owner,
+                "claim_expires": claim_expires,
+                "expires_at": unix_now + LEDGER_TTL_SECONDS,
+            },
+            ConditionExpression="attribute_not_exists(guild_id) OR (#status = :claimed AND claim_expires < :now)",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues={":claimed": STATUS_CLAIMED, ":now": unix_now},
+        )
+
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code == "ConditionalCheckFailedException":
+            raise BroadcastAlreadyClaimedError(
+                f"Broadcast of {broadcast_date} already claimed for guild {guild_id}."
+            )
+        raise
+
+
+def settle_guilds_or_raise(
+    broadcast_date: str, statuses: dict[int, str], owner: str, unix_now: int
+) -> None:
+    # {guild_id: terminal status}. The rows are either claimed by `owner` or, for
+    # guilds without a channel, claimed by nobody, so they can be overwritten in
+    # batch
+    with broadcast_ledger_table.batch_writer() as batch:
+        for guild_id, status in statuses.items():
+            batch.put_item(
+                Item={
+                    "broadcast_date": broadcast_date,
+                    "guild_id": guild_id,
+                    "status": status,
+                    "owner": owner,
+                    "claim_expires": 0,
+                    "settled_at": unix_now,
+                    "expires_at": unix_now + LEDGER_TTL_SECONDS,
+                }
+            )
+
+
+def release_claims_or_raise(broadcast_date: str, guild_ids: set[int]) -> None:
+    # Lets the next invocation send these updates without waiting for the claims to expire
+    with broadcast_ledger_table.batch_writer() as batch:
+        for guild_id in guild_ids:
+            batch.delete_item(
+                Key={"broadcast_date": broadcast_date, "guild_id": guild_id}
+            )
+
+
+async def get_settled_guild_ids(broadcast_date: str, unix_now: int) -> Result:
+    try:
+        settled_guild_ids = await asyncio.to_thread(
+            get_settled_guild_ids_or_raise, broadcast_date, unix_now
+        )
+        return Result(success=True, data={"settled_guild_ids": settled_guild_ids})
+
+    except Exception as e:
+        text = "Failed to read broadcast ledger."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(f"{text} broadcast_date={broadcast_date} {exception_text}")
+        return Result(success=False, text=text)
+
+
+async def claim_guild(
+    broadcast_date: str,
+    guild_id: int,
+    owner: str,
+    unix_now: int,
+    claim_expires: int,
+) -> Result:
+    try:
+        await asyncio.to_thread(
+            claim_guild_or_raise,
+            broadcast_date,
+            guild_id,
+            owner,
+            unix_now,
+            claim_expires,
+        )
+        return Result(success=True)
+
+    except BroadcastAlreadyClaimedError as e:
+        logger.info(str(e))
+        return Result(success=False, text=str(e))
+
+    except Exception as e:
+        text = "Failed to claim broadcast."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(
+            f"{text} broadcast_date={broadcast_date} guild_id={guild_id} {exception_text}"
+        )
+        return Result(success=False, text=text)
+
+
+async def settle_guilds(
+    broadcast_date: str, statuses: dict[int, str], owner: str, unix_now: int
+) -> Result:
+    try:
+        await asyncio.to_thread(
+            settle_guilds_or_raise, broadcast_date, statuses, owner, unix_now
+        )
+        return Result(success=True)
+
+    except Exception as e:
+        text = "Failed to record settled broadcasts."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(
+            f"{text} broadcast_date={broadcast_date} statuses={statuses} {exception_text}"
+        )
+        return Result(success=False, text=text)
+
+
+async def release_claims(broadcast_date: str, guild_ids: set[int]) -> Result:
+    try:
+        await asyncio.to_thread(release_claims_or_raise, broadcast_date, guild_ids)
+        return Result(success=True)
+
+    except Exception as e:
+        text = "Failed to release broadcast claims."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(
+            f"{text} broadcast_date={broadcast_date} guild_ids={guild_ids} {exception_text}"
+        )
+        return Result(success=False, text=text)
@@ -10,5 +10,17 @@ class SkinNotTrackedError(Exception):
     pass
 
 
-class Last24hPriceNotAvailable(Exception):
+class ShardLeaseHeldError(Exception):
+    pass
+
+
+class PortfolioLimitExceededError(Exception):
+    pass
+
+
+class BroadcastAlreadyClaimedError(Exception):
+    pass
+
+
+class FxRatesTooOldError(Exception):
     pass
@@ -0,0 +1,25 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import boto3
+
+from db.exceptions import FxRatesTooOldError
+
+dynamodb_client = boto3.resource("dynamodb")
+fx_rates_table = dynamodb_client.Table("skinsbot.fx_rates")
+# the workers refresh the rates a few times a day, older ones aren't shown
+MAX_FX_RATES_AGE_DAYS = 2
+
+
+def get_latest_fx_rates_or_raise() -> dict[str, Decimal]:
+    # Written by workers/fx.py: {currency: units per 1 USD}
+    response = fx_rates_table.get_item(Key={"date": "latest"})
+    item = response.get("Item")
+    if not item:
+        raise ValueError("No FX rates in database.")
+
+    today = datetime.now(timezone.utc).date()
+    as_of = date.fromisoformat(item["as_of"])
+    if as_of < today - timedelta(days=MAX_FX_RATES_AGE_DAYS):
+        raise FxRatesTooOldError(f"FX rates are as of {as_of}.")
+    return item["rates"]
@@ -65,29 +65,26 @@ async def update_channel(guild_id: int, channel_id: int) -> Result:
         )
 
 
-def get_guild_channel_or_raise(guild_id: int) -> int:
+def get_guild_info_or_raise(guild_id: int) -> dict:
     response = guild_info_table.query(
         KeyConditionExpression=Key("guild_id").eq(guild_id)
     )
     if response.get("Items"):
-        return response.get("Items")[0].get("channel_id")
+        return response.get("Items")[0]
     raise ValueError(f"Guild {guild_id} not found in database.")
 
 
-async def get_guild_channel(guild_id: int) -> Result:
-    try:
-        channel_id = await asyncio.to_thread(get_guild_channel_or_raise, guild_id)
-        return Result(success=True, data={"channel_id": channel_id})
-
-    except ValueError as e:
-        logger.info(f"Guild {guild_id} has no channel set, can't send updates.")
-        return Result(success=True, text=str(e), data={"channel_id": None})
-
-    except Exception as e:
-        text = "Failed to get guild channel."
-        exception_text = f"{type(e).__name__}: {e}"
-        logger.error(f"{text} guild_id={guild_id} {exception_text}")
-        return Result(success=False, text=text)
+def get_all_guild_info_or_raise() -> dict[int, dict]:
+    # Paginated scan of the whole table, keyed by guild_id
+    guild_infos = {}
+    kwargs = {"ProjectionExpression": "guild_id, channel_id, currency"}
+    while True:
+        response = guild_info_table.scan(**kwargs)
+        for item in response.get("Items", []):
+            guild_infos[int(item["guild_id"])] = item
+        if not response.get("LastEvaluatedKey"):
+            return guild_infos
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
 
 def get_max_tracked_skins_or_raise(guild_id: int) -> int:
@@ -99,3 +96,45 @@ def get_max_tracked_skins_or_raise(guild_id: int) -> int:
         return max_tracked_skins
 
     return 0  # This is for a guild_id that is not in the db
+
+
+def update_currency_or_raise(guild_id: int, currency: str) -> None:
+    add_guild_or_raise(guild_id)  # if the guild isn't in DB for some reason, adds it
+
+    guild_info_table.update_item(
+        Key={"guild_id": guild_id},
+        UpdateExpression="SET currency = :currency",
+        ExpressionAttributeValues={":currency": currency},
+    )
+
+
+async def update_currency(guild_id: int, currency: str) -> Result:
+    try:
+        await asyncio.to_thread(update_currency_or_raise, guild_id, currency)
+        return Result(
+            success=True,
+            text=f":white_check_mark: Prices will now be shown in {currency}!",
+        )
+
+    except Exception as e:
+        text = "Failed to update currency."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(f"{text} guild_id={guild_id} currency={currency} {exception_text}")
+        return Result(success=False, text=text)
+
+
+async def get_guild_currency(guild_id: int) -> str | None:
+    # Best effort: prices are shown in USD if the currency can't be read
+    try:
+        guild_info = await asyncio.to_thread(get_guild_info_or_raise, guild_id)
+        return guild_info.get("currency")
+
+    except ValueError:
+        return None
+
+    except Exception as e:
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(
+            f"Failed to get guild currency. guild_id={guild_id} {exception_text}"
+        )
+        return None
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from urllib.parse import unquote
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from db.exceptions import PortfolioLimitExceededError
+from models.result import Result
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+dynamodb_client = boto3.resource("dynamodb")
+portfolios_table = dynamodb_client.Table("skinsbot.portfolios")
+
+MAX_PORTFOLIO_ITEMS = 500
+
+
+def get_holdings_or_raise(guild_id: int) -> dict[str, int]:
+    holdings = {}
+    kwargs = {"KeyConditionExpression": Key("guild_id").eq(guild_id)}
+    while True:
+        response = portfolios_table.query(**kwargs)
+        for item in response.get("Items", []):
+            holdings[item["hash_name"]] = int(item["quantity"])
+        if not response.get("LastEvaluatedKey"):
+            return holdings
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+async def get_holdings(guild_id: int) -> Result:
+    try:
+        holdings = await asyncio.to_thread(get_holdings_or_raise, guild_id)
+        return Result(success=True, data={"holdings": holdings})
+
+    except Exception as e:
+        text = "Failed to get portfolio."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(f"{text} guild_id={guild_id} {exception_text}")
+        return Result(success=False, text=text)
+
+
+def set_holding_or_raise(guild_id: int, hash_name: str, quantity: int) -> None:
+    # A quantity of 0 removes the skin from the portfolio
+    if quantity == 0:
+        portfolios_table.delete_item(Key={"guild_id": guild_id, "hash_name": hash_name})
+        return
+
+    holdings = get_holdings_or_raise(guild_id)
+    if hash_name not in holdings and len(holdings) >= MAX_PORTFOLIO_ITEMS:
+        raise PortfolioLimitExceededError(
+            f":cross_mark: Portfolio limit ({MAX_PORTFOLIO_ITEMS} skins) reached for this server."
+        )
+    portfolios_table.put_item(
+        Item={"guild_id": guild_id, "hash_name": hash_name, "quantity": quantity}
+    )
+
+
+async def set_holding(guild_id: int, hash_name: str, quantity: int) -> Result:
+    try:
+        await asyncio.to_thread(set_holding_or_raise, guild_id, hash_name, quantity)
+        if quantity == 0:
+            text = (
+                f":white_check_mark: `{unquote(hash_name)}` removed from the portfolio!"
+            )
+        else:
+            text = f":white_check_mark: Portfolio now holds {quantity}x `{unquote(hash_name)}`!"
+        return Result(success=True, text=text)
+
+    except PortfolioLimitExceededError as e:
+        return Result(success=False, text=str(e))
+
+    except Exception as e:
+        text = f"Failed to update portfolio with hash name {hash_name}."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(f"{text} guild_id={guild_id} {exception_text}")
+        return Result(success=False, text=text)
@@ -0,0 +1,100 @@
+import logging
+
+import boto3
+from botocore.exceptions import ClientError
+
+from db.exceptions import ShardLeaseHeldError
+from models.result import Result
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+dynamodb_client = boto3.resource("dynamodb")
+shard_leases_table = dynamodb_client.Table("skinsbot.shard_leases")
+
+
+def get_shard_key(shard_id: int, shard_count: int) -> str:
+    return f"{shard_id}/{shard_count}"
+
+
+def acquire_lease_or_raise(
+    shard_id: int, shard_count: int, owner: str, unix_now: int, lease_expires: int
+) -> None:
+    """
+    Take the lease of a shard until `lease_expires`, so only one process runs it
+    at a time. The write only succeeds if nobody holds an unexpired lease.
+    """
+    shard_key = get_shard_key(shard_id, shard_count)
+    try:
+        shard_leases_table.put_item(
+            Item={
+                "shard_key": shard_key,
+                "owner": owner,
+                "lease_expires": lease_expires,
+            },
+            ConditionExpression="attribute_not_exists(shard_key) OR lease_expires < :now OR #owner = :owner",
+            ExpressionAttributeNames={"#owner": "owner"},
+            ExpressionAttributeValues={":now": unix_now, ":owner": owner},
+        )
+
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code == "ConditionalCheckFailedException":
+            raise ShardLeaseHeldError(f"Shard {shard_key} is already running.")
+        raise
+
+
+def release_lease_or_raise(shard_id: int, shard_count: int, owner: str) -> None:
+    try:
+        shard_leases_table.delete_item(
+            Key={"shard_key": get_shard_key(shard_id, shard_count)},
+            ConditionExpression="#owner = :owner",
+            ExpressionAttributeNames={"#owner": "owner"},
+            ExpressionAttributeValues={":owner": owner},
+        )
+
+    except ClientError as e:
+        code = e.response.get("Error", {}).get("Code")
+        if code != "ConditionalCheckFailedException":
+            raise  # otherwise the lease expired and was taken over, nothing to do
+
+
+def acquire_leases(
+    shard_ids: list[int],
+    shard_count: int,
+    owner: str,
+    unix_now: int,
+    lease_expires: int,
+) -> Result:
+    acquired = []
+    try:
+        for shard_id in shard_ids:
+            acquire_lease_or_raise(
+                shard_id, shard_count, owner, unix_now, lease_expires
+            )
+            acquired.append(shard_id)
+        return Result(success=True)
+
+    except ShardLeaseHeldError as e:
+        logger.info(str(e))
+        release_leases(acquired, shard_count, owner)
+        return Result(success=False, text=str(e))
+
+    except Exception as e:
+        text = "Failed to acquire shard leases."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(f"{text} shard_ids={shard_ids} {exception_text}")
+        release_leases(acquired, shard_count, owner)
+        return Result(success=False, text=text)
+
+
+def release_leases(shard_ids: list[int], shard_count: int, owner: str) -> Result:
+    try:
+        for shard_id in shard_ids:
+            release_lease_or_raise(shard_id, shard_count, owner)
+        return Result(success=True)
+
+    except Exception as e:
+        text = "Failed to release shard leases."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(f"{text} shard_ids={shard_ids} {exception_text}")
+        return Result(success=False, text=text)
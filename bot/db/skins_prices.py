@@ -1,61 +1,114 @@
 import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 import logging
-import time
-from urllib.parse import unquote
 
 import boto3
 from boto3.dynamodb.conditions import Key
 
-from db.exceptions import Last24hPriceNotAvailable
 from models.result import Result
+from models.rollups import unpack_points
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 dynamodb_client = boto3.resource("dynamodb")
 skin_prices_table = dynamodb_client.Table("skinsbot.skin_prices")
+skin_price_rollups_table = dynamodb_client.Table("skinsbot.skin_price_rollups")
+SKIN_STATS_TABLE_NAME = "skinsbot.skin_stats"
+BATCH_GET_MAX_KEYS = 100  # DynamoDB limit per BatchGetItem call
 
 
-def get_most_recent_price_or_raise(hash_name: str) -> str:
-    unix_now = int(time.time())
-    response = skin_prices_table.query(
-        KeyConditionExpression=Key("hash_name").eq(hash_name)
-        & Key("unix_timestamp").gt(unix_now - 24 * 3600)
-    )
-    try:
-        most_recent_entry = max(
-            response.get("Items", []), key=lambda d: d["unix_timestamp"]
-        )
-        return most_recent_entry["price_usd"]
+def get_price_history_or_raise(hash_name: str, since: int) -> list[tuple[int, Decimal]]:
+    """
+    Return the (unix_timestamp, price_usd) points of `hash_name` since `since`,
+    oldest first. Older history comes from the per-day/per-week rollups (one item
+    per period), recent history from the raw points that haven't expired yet.
+    """
+    points = {}
+    since_day = datetime.fromtimestamp(since, timezone.utc).date()
+    since_week = since_day - timedelta(days=since_day.weekday())
+    # only the periods overlapping [since, now): day records from the day of
+    # `since`, week records (starting on Monday) from its week
+    for prefix, first_period_start in (("day#", since_day), ("week#", since_week)):
+        kwargs = {
+            "KeyConditionExpression": Key("hash_name").eq(hash_name)
+            & Key("period").between(
+                f"{prefix}{first_period_start.isoformat()}", f"{prefix}9999-12-31"
+            )
+        }
+        while True:
+            response = skin_price_rollups_table.query(**kwargs)
+            for rollup in response.get("Items", []):
+                points |= unpack_points(rollup)
+            if not response.get("LastEvaluatedKey"):
+                break
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
-    except (ValueError, KeyError):
-        raise Last24hPriceNotAvailable(
-            f"Couldn't find a price for {unquote(hash_name)} in the last 24h."
-        )
+    kwargs = {
+        "KeyConditionExpression": Key("hash_name").eq(hash_name)
+        & Key("unix_timestamp").gte(since),
+        "ProjectionExpression": "unix_timestamp, price_usd",
+    }
+    while True:
+        response = skin_prices_table.query(**kwargs)
+        for item in response.get("Items", []):
+            points[int(item["unix_timestamp"])] = item["price_usd"]
+        if not response.get("LastEvaluatedKey"):
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
+    return sorted((ts, price) for ts, price in points.items() if ts >= since)
 
-async def get_most_recent_price(hash_name: str) -> Result:
-    try:
-        price = await asyncio.to_thread(get_most_recent_price_or_raise, hash_name)
-        return Result(success=True, data={"price_usd": price})
 
-    except Last24hPriceNotAvailable as e:
-        return Result(success=False, text=str(e))
+async def get_price_history(hash_name: str, since: int) -> Result:
+    try:
+        history = await asyncio.to_thread(get_price_history_or_raise, hash_name, since)
+        return Result(success=True, data={"history": history})
 
     except Exception as e:
-        text = f"Failed to get most recent price for hash_name={hash_name}"
+        text = f"Failed to get price history for hash_name={hash_name}"
         exception_text = f"{type(e).__name__}: {e}"
         logger.error(f"{text} {exception_text}")
         return Result(success=False, text=text)
 
 
-async def get_most_recent_prices(hash_names: list[str]):
-    hash_name_to_price_usd_map = {}
-    for hash_name in hash_names:
-        price_result = await get_most_recent_price(hash_name)
-        if not price_result.success:
-            hash_name_to_price_usd_map[hash_name] = None
-            continue
+def get_latest_prices_or_raise(hash_names: list[str]) -> dict[str, dict]:
+    """
+    Batch read the latest price of many hash names from `skinsbot.skin_stats`,
+    which the workers update on every refresh: one call per 100 hash names
+    instead of one query per hash name.
 
-        price = price_result.data.get("price_usd")
-        hash_name_to_price_usd_map[hash_name] = price
-    return hash_name_to_price_usd_map
+    Returns {hash_name: {"last_price", "prev_day_price", "last_refresh"}} for the
+    hash names that have been refreshed at least once.
+    """
+    latest_prices = {}
+    unique_hash_names = list(dict.fromkeys(hash_names))
+    for i in range(0, len(unique_hash_names), BATCH_GET_MAX_KEYS):
+        request_items = {
+            SKIN_STATS_TABLE_NAME: {
+                "Keys": [
+                    {"hash_name": hn}
+                    for hn in unique_hash_names[i : i + BATCH_GET_MAX_KEYS]
+                ],
+                "ProjectionExpression": "hash_name, last_price, prev_day_price, last_refresh",
+            }
+        }
+        while request_items:
+            response = dynamodb_client.batch_get_item(RequestItems=request_items)
+            for item in response.get("Responses", {}).get(SKIN_STATS_TABLE_NAME, []):
+                latest_prices[item.pop("hash_name")] = item
+            # throttled keys come back unprocessed and have to be asked again
+            request_items = response.get("UnprocessedKeys")
+    return latest_prices
+
+
+async def get_latest_prices(hash_names: list[str]) -> Result:
+    try:
+        latest_prices = await asyncio.to_thread(get_latest_prices_or_raise, hash_names)
+        return Result(success=True, data={"latest_prices": latest_prices})
+
+    except Exception as e:
+        text = "Failed to get latest prices."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(f"{text} {exception_text}")
+        return Result(success=False, text=text)
@@ -1,5 +1,8 @@
+from array import array
 import asyncio
 import logging
+import threading
+import time
 from urllib.parse import unquote
 
 import boto3
@@ -13,12 +16,23 @@ from db.exceptions import (
 )
 from db.guild_info import get_max_tracked_skins_or_raise
 from models.result import Result
+from models.skin_names import get_plain_name, skin_names
+from models.tracking_index import TrackingIndex
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 dynamodb_client = boto3.resource("dynamodb")
 tracked_skins_table = dynamodb_client.Table("skinsbot.tracked_skins")
 
+# guild_id -> (expires_at, tracked skin ids), used to serve autocomplete
+TRACKED_CACHE_TTL_SECONDS = 60
+tracked_hash_names_cache = {}
+# Loaded in full by the first broadcast of the process, then kept up to date by
+# the track/untrack commands, which for a guild always reach the process running
+# its shard. Commands and broadcasts use it from worker threads, hence the lock
+tracking_index: TrackingIndex | None = None
+tracking_index_lock = threading.Lock()
+
 
 def get_tracked_hash_names_or_raise(guild_id: int) -> list[str]:
     response: dict = tracked_skins_table.query(
@@ -30,12 +44,80 @@ def get_tracked_hash_names_or_raise(guild_id: int) -> list[str]:
     return guild_tracked_hash_names
 
 
+def load_tracking_index_or_raise() -> TrackingIndex:
+    """
+    Read every (guild_id, hash_name) pair with a paginated scan: one call per
+    1MB of data, whatever the number of guilds.
+    """
+    index = TrackingIndex()
+    kwargs = {"ProjectionExpression": "guild_id, hash_name"}
+    while True:
+        response = tracked_skins_table.scan(**kwargs)
+        for item in response.get("Items", []):
+            index.add(int(item["guild_id"]), item["hash_name"])
+        if not response.get("LastEvaluatedKey"):
+            return index
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def get_tracking_index_or_raise() -> TrackingIndex:
+    global tracking_index
+    with tracking_index_lock:
+        if tracking_index is None:
+            tracking_index = load_tracking_index_or_raise()
+        return tracking_index
+
+
+def add_to_tracking_index(guild_id: int, hash_name: str) -> None:
+    with tracking_index_lock:
+        # the load may have run after the DB write and read the pair already
+        if tracking_index is not None and not tracking_index.contains(
+            guild_id, hash_name
+        ):
+            tracking_index.add(guild_id, hash_name)
+
+
+def remove_from_tracking_index(guild_id: int, hash_name: str) -> None:
+    with tracking_index_lock:
+        if tracking_index is not None:
+            tracking_index.remove(guild_id, hash_name)
+
+
+async def get_cached_tracked_skin_ids(guild_id: int) -> array:
+    """
+    Tracked skins of a guild as ids in models.skin_names.skin_names, cached in
+    memory for autocomplete, which must answer within Discord's 3 second limit.
+    Returns an empty array if the DB read fails.
+    """
+    expires_at, skin_ids = tracked_hash_names_cache.get(guild_id, (0, array("I")))
+    if expires_at > time.monotonic():
+        return skin_ids
+
+    try:
+        hash_names = await asyncio.to_thread(get_tracked_hash_names_or_raise, guild_id)
+        skin_ids = array("I", map(skin_names.intern, hash_names))
+        tracked_hash_names_cache[guild_id] = (
+            time.monotonic() + TRACKED_CACHE_TTL_SECONDS,
+            skin_ids,
+        )
+        return skin_ids
+
+    except Exception as e:
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(
+            f"Failed to get tracked hash names. guild_id={guild_id} {exception_text}"
+        )
+        return array("I")
+
+
 async def get_tracked_hash_names(guild_id: int) -> Result:
     try:
         tracked_hash_names = await asyncio.to_thread(
             get_tracked_hash_names_or_raise, guild_id
         )
-        unquoted_hash_names = [f"`{unquote(skin)}`" for skin in tracked_hash_names]
+        unquoted_hash_names = [
+            f"`{get_plain_name(skin)}`" for skin in tracked_hash_names
+        ]
 
         if len(tracked_hash_names) > 0:
             text = f"Tracked skins:\n* " + "\n* ".join(unquoted_hash_names)
@@ -66,6 +148,8 @@ def track_hash_name_or_raise(guild_id: int, hash_name: str) -> None:
         )
 
     tracked_skins_table.put_item(Item={"guild_id": guild_id, "hash_name": hash_name})
+    tracked_hash_names_cache.pop(guild_id, None)
+    add_to_tracking_index(guild_id, hash_name)
 
 
 async def track_hash_name(guild_id: int, hash_name: str) -> Result:
@@ -94,6 +178,8 @@ def untrack_hash_name_or_raise(guild_id: int, hash_name: str) -> None:
         Key={"guild_id": guild_id, "hash_name": hash_name},
         ConditionExpression="attribute_exists(guild_id) AND attribute_exists(hash_name)",
     )
+    tracked_hash_names_cache.pop(guild_id, None)
+    remove_from_tracking_index(guild_id, hash_name)
 
 
 async def untrack_hash_name(guild_id: int, hash_name: str) -> Result:
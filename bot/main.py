@@ -1,23 +1,51 @@
 import asyncio
-from datetime import datetime, time, timezone
+from datetime import datetime, timedelta, timezone
+import functools
 import logging
 from urllib.parse import quote, unquote
+import uuid
 
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 
 
 import config
+import db.broadcast_ledger
 import db.guild_info
+import db.portfolios
+import db.shard_leases
 import db.skins_prices
 import db.tracked_skins
+from models.skin_names import skin_names
+from services.broadcast import (
+    BROADCAST_TIME,
+    LEDGER_BATCH,
+    BroadcastLedger,
+    get_broadcast_date,
+    get_unix_now,
+    is_broadcast_due,
+    plan_broadcast,
+)
+from services.currency import CURRENCY_SYMBOLS, get_fx_rates
+from services.item_index import get_item_index
+from services.portfolio import value_portfolio
+from services.send_queue import SendQueue
+from services.shutdown import CANCEL_MARGIN_SECONDS, DRAIN_SECONDS, ShutdownCoordinator
 from services.ssm import get_parameter
-from services.steam_api.validate import get_hash_name, validate_add_skin_argument
+from services.steam_api.validate import (
+    get_stored_hash_name,
+    validate_add_skin_argument,
+)
 from utils.bot_utils import get_shutdown_time
 from utils.render_messages import (
+    SkinPricesRenderer,
+    group_embeds,
     render_formatting_help_msg,
-    render_skin_prices_message,
     render_help_embed,
+    render_portfolio_embeds,
+    render_price_history_embed,
+    render_restarting_msg,
 )
 
 logging.basicConfig(
@@ -28,57 +56,248 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+# Slash commands don't need the privileged message_content intent, prefix
+# commands do. Set ENABLE_PREFIX_COMMANDS=false once users moved to slash commands
+intents.message_content = config.ENABLE_PREFIX_COMMANDS
 
 PARAMETER_NAME = config.DISCORD_TOKEN_SSM_PATH
 DISCORD_TOKEN = get_parameter(PARAMETER_NAME)
 COMMAND_PREFIX = "->"
+PRICE_HISTORY_DAYS = 30  # default range of price_history
 
 
-async def run_bot_for(seconds: int | None):
-    bot = commands.Bot(
-        command_prefix=COMMAND_PREFIX, intents=intents, help_command=None
+class ShutdownAwareTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Refuses slash commands (and autocompletes) once the bot is shutting down
+        if self.client.shutdown_coordinator.accepting:
+            return True
+        if interaction.type == discord.InteractionType.application_command:
+            await interaction.response.send_message(
+                render_restarting_msg(), ephemeral=True
+            )
+        return False
+
+
+def create_bot(shard_ids: list[int] | None) -> commands.Bot:
+    if config.SHARD_COUNT == 1:
+        bot = commands.Bot(
+            command_prefix=COMMAND_PREFIX,
+            intents=intents,
+            help_command=None,
+            tree_cls=ShutdownAwareTree,
+        )
+    else:
+        # Each process only connects the given shards, i.e. only sees their guilds,
+        # so gateway traffic and broadcasts are split across processes
+        bot = commands.AutoShardedBot(
+            command_prefix=COMMAND_PREFIX,
+            intents=intents,
+            help_command=None,
+            tree_cls=ShutdownAwareTree,
+            shard_count=config.SHARD_COUNT,
+            shard_ids=shard_ids,
+        )
+    bot.shutdown_coordinator = ShutdownCoordinator()
+    return bot
+
+
+async def complete_item_names(current: str) -> list[app_commands.Choice[str]]:
+    if not current:
+        return []
+    item_index = await asyncio.to_thread(get_item_index)
+    return [
+        app_commands.Choice(name=name, value=name)
+        for name in item_index.complete(current)
+        if len(name) <= 100  # Discord's limit on choices
+    ]
+
+
+async def render_guild_portfolio(guild_id: int) -> list[discord.Embed] | str:
+    # Two DB round trips: the holdings, then one batched read of their prices
+    holdings_result = await db.portfolios.get_holdings(guild_id)
+    if not holdings_result.success:
+        return holdings_result.text
+
+    holdings = holdings_result.data["holdings"]
+    prices_result = await db.skins_prices.get_latest_prices(list(holdings))
+    if not prices_result.success:
+        return prices_result.text
+
+    valuation = value_portfolio(holdings, prices_result.data["latest_prices"])
+    currency = await db.guild_info.get_guild_currency(guild_id)
+    fx_rates = await asyncio.to_thread(get_fx_rates)
+    return render_portfolio_embeds(valuation, COMMAND_PREFIX, currency, fx_rates)
+
+
+async def render_price_history(
+    guild_id: int, skin: str, days: int
+) -> discord.Embed | str:
+    hash_name_result = await get_stored_hash_name(skin)
+    if not hash_name_result.success:
+        return hash_name_result.text
+
+    hash_name = hash_name_result.data["hash_name"]
+    since = get_unix_now() - days * 24 * 3600
+    history_result = await db.skins_prices.get_price_history(hash_name, since)
+    if not history_result.success:
+        return history_result.text
+
+    currency = await db.guild_info.get_guild_currency(guild_id)
+    fx_rates = await asyncio.to_thread(get_fx_rates)
+    return render_price_history_embed(
+        hash_name, history_result.data["history"], days, currency, fx_rates
     )
 
+
+async def set_guild_currency(guild_id: int, currency: str) -> str:
+    currency = currency.strip().upper()
+    if currency not in CURRENCY_SYMBOLS:
+        supported = ", ".join(f"`{c}`" for c in CURRENCY_SYMBOLS)
+        return f":cross_mark: Unsupported currency. Use one of: {supported}"
+    result = await db.guild_info.update_currency(guild_id, currency)
+    return result.text
+
+
+async def set_guild_holding(guild_id: int, command_argument: str) -> str:
+    quantity, _, skin = command_argument.partition(" ")
+    if not quantity.isdigit() or not skin.strip():
+        return (
+            f":cross_mark: Usage: `{COMMAND_PREFIX}set_holding <quantity> <skin name>` "
+            "(a quantity of 0 removes the skin)"
+        )
+
+    if int(quantity) == 0:
+        hash_name_result = await get_stored_hash_name(skin.strip())
+    else:
+        hash_name_result = await validate_add_skin_argument(skin.strip())
+    if not hash_name_result.success:
+        return hash_name_result.text
+
+    hash_name = hash_name_result.data["hash_name"]
+    result = await db.portfolios.set_holding(guild_id, hash_name, int(quantity))
+    return result.text
+
+
+async def run_bot_for(
+    shutdown_time: datetime | None,
+    shard_ids: list[int] | None = None,
+    sync_commands: bool = False,
+):
+    bot = create_bot(shard_ids)
+    coordinator = bot.shutdown_coordinator
+    broadcast_lock = asyncio.Lock()
+    catch_up_started = False
+    # identifies this process in the broadcast ledger; its claims outlive it by a
+    # few seconds but expire before the next scheduled run
+    owner = str(uuid.uuid4())
+    claim_expires = int(shutdown_time.timestamp()) + 10 if shutdown_time else None
+
+    @bot.check
+    async def accepting_commands(ctx: commands.Context) -> bool:
+        if coordinator.accepting:
+            return True
+        await ctx.send(render_restarting_msg())
+        return False
+
+    # prefix commands are in flight from before_invoke to after_invoke
+    @bot.before_invoke
+    async def begin_command(ctx: commands.Context) -> None:
+        coordinator.begin()
+
+    @bot.after_invoke
+    async def end_command(ctx: commands.Context) -> None:
+        coordinator.end()
+
     @tasks.loop(count=1)
     async def shutdown_bot():
-        if seconds is None:
+        """
+        Stop accepting work DRAIN_SECONDS before `shutdown_time`, let in-flight
+        work finish, cancel what is left (broadcasts record the guilds already sent
+        in the ledger) and close the bot.
+        """
+        if shutdown_time is None:
             return
-        await asyncio.sleep(seconds)
+        await discord.utils.sleep_until(
+            shutdown_time - timedelta(seconds=DRAIN_SECONDS)
+        )
+        coordinator.stop_accepting()
+        drain_until = shutdown_time - timedelta(seconds=CANCEL_MARGIN_SECONDS)
+        await coordinator.drain(
+            (drain_until - datetime.now(timezone.utc)).total_seconds()
+        )
         logger.info("Shutting down bot to avoid lambda timeout")
         await bot.close()
 
-    @tasks.loop(time=time(19, 5))  # UTC
-    async def send_price_updates():
-        guild_list = bot.guilds
-        for guild in guild_list:
-            get_channel_result = await db.guild_info.get_guild_channel(guild.id)
-
-            # db.guild_info.get_guild_channel already logs the following if statements
-            if not get_channel_result.success:
-                continue
-            channel_id = get_channel_result.data.get("channel_id")
-            if channel_id is None:
-                continue
-
-            tracked_hash_names_result = await db.tracked_skins.get_tracked_hash_names(
-                guild.id
-            )
-            if not tracked_hash_names_result.success:
-                await bot.get_channel(channel_id).send(tracked_hash_names_result.text)
-                continue
+    async def broadcast_price_updates(broadcast_date: str) -> None:
+        """
+        Send the update of `broadcast_date` to the guilds of this process that are
+        still owed it according to the delivery ledger.
+        """
+        settled_result = await db.broadcast_ledger.get_settled_guild_ids(
+            broadcast_date, get_unix_now()
+        )
+        if not settled_result.success:
+            return
+        settled_guild_ids = settled_result.data["settled_guild_ids"]
+        owed_guild_ids = {guild.id for guild in bot.guilds} - settled_guild_ids
+        if not owed_guild_ids:
+            return
 
-            message = "Tracked skins prices:\n"
-            tracked_hash_names = tracked_hash_names_result.data.get(
-                "tracked_hash_names", []
-            )
-            hash_name_price_map = await db.skins_prices.get_most_recent_prices(
-                tracked_hash_names
-            )
-            message = render_skin_prices_message(hash_name_price_map)
+        # one bulk plan for every guild owed the update
+        plan_result = await plan_broadcast(owed_guild_ids)
+        if not plan_result.success:
+            return
+        plan = plan_result.data["plan"]
+        logger.info(f"Broadcast of {broadcast_date} owed to {len(plan.guilds)} guilds")
+
+        ledger = BroadcastLedger(broadcast_date, owner, claim_expires)
+        # settled once, not re-planned by every later invocation of the day
+        ledger.record_no_channel(plan.no_channel_guild_ids)
+        if not plan.guilds:
+            await ledger.close()
+            return
+
+        fx_rates = await asyncio.to_thread(get_fx_rates)
+        # shared by every guild of this broadcast
+        renderer = SkinPricesRenderer(fx_rates)
+        try:
+            async with SendQueue(bot) as send_queue:
+                for guild in plan.guilds:
+                    if not await ledger.claim(guild.guild_id):
+                        continue  # sent or being sent by another process
+                    skin_prices = plan.get_skin_prices(guild)
+                    embeds = renderer.render_skins(skin_prices, guild.currency)
+                    # usually a single message: a guild's update is sent as one
+                    # unit and only marked as sent if every message was
+                    messages = [{"embeds": group} for group in group_embeds(embeds)]
+                    await send_queue.put_all(
+                        guild.channel_id,
+                        messages,
+                        on_done=functools.partial(ledger.record, guild.guild_id),
+                    )
+                    if len(ledger.pending) >= LEDGER_BATCH:
+                        await ledger.flush()
+        finally:
+            # also runs when the shutdown cancels the broadcast
+            await ledger.close()
+
+    async def run_broadcast() -> None:
+        if not coordinator.accepting or broadcast_lock.locked():
+            return
+        async with broadcast_lock:
+            # a task per broadcast: the loop tasks starting them never finish
+            await coordinator.run(broadcast_price_updates(get_broadcast_date()))
+
+    @tasks.loop(time=BROADCAST_TIME)
+    async def send_price_updates():
+        await run_broadcast()
 
-            await bot.get_channel(channel_id).send(embed=message)
+    @tasks.loop(count=1)
+    async def catch_up_price_updates():
+        # Whichever invocation is live at BROADCAST_TIME, every later one sends
+        # the update to the guilds the ledger says are still owed it
+        if is_broadcast_due():
+            await run_broadcast()
 
     @bot.event
     async def on_guild_join(guild: discord.Guild) -> None:
@@ -133,13 +352,47 @@ async def run_bot_for(seconds: int | None):
         result = await db.tracked_skins.get_tracked_hash_names(guild.id)
         await channel.send(result.text)
 
+    @bot.command()
+    async def set_currency(ctx: commands.Context) -> None:
+        head = f"{ctx.prefix}{ctx.invoked_with}"
+        command_argument = ctx.message.content[len(head) :].strip()
+        await ctx.channel.send(await set_guild_currency(ctx.guild.id, command_argument))
+
+    @bot.command()
+    async def portfolio(ctx: commands.Context) -> None:
+        rendered = await render_guild_portfolio(ctx.guild.id)
+        if isinstance(rendered, str):
+            await ctx.channel.send(rendered)
+            return
+        # one message unless the portfolio overflows Discord's embed limits
+        for group in group_embeds(rendered):
+            await ctx.channel.send(embeds=group)
+
+    @bot.command()
+    async def price_history(ctx: commands.Context) -> None:
+        head = f"{ctx.prefix}{ctx.invoked_with}"
+        command_argument = ctx.message.content[len(head) :].strip()
+        rendered = await render_price_history(
+            ctx.guild.id, command_argument, PRICE_HISTORY_DAYS
+        )
+        if isinstance(rendered, str):
+            await ctx.channel.send(rendered)
+            return
+        await ctx.channel.send(embed=rendered)
+
+    @bot.command()
+    async def set_holding(ctx: commands.Context) -> None:
+        head = f"{ctx.prefix}{ctx.invoked_with}"
+        command_argument = ctx.message.content[len(head) :].strip()
+        await ctx.channel.send(await set_guild_holding(ctx.guild.id, command_argument))
+
     @bot.command()
     async def remove_skin(ctx: commands.Context) -> None:
         guild = ctx.guild
         channel = ctx.channel
         head = f"{ctx.prefix}{ctx.invoked_with}"
         command_argument = ctx.message.content[len(head) :].strip()
-        hash_name_result = get_hash_name(command_argument)
+        hash_name_result = await get_stored_hash_name(command_argument)
         if not hash_name_result.success:
             await channel.send(hash_name_result.text)
             return
@@ -148,27 +401,214 @@ async def run_bot_for(seconds: int | None):
         untrack_result = await db.tracked_skins.untrack_hash_name(guild.id, hash_name)
         await channel.send(untrack_result.text)
 
+    @bot.tree.command(name="add_skin", description="Start tracking a skin's price.")
+    @app_commands.describe(skin="Skin name or Steam Market link")
+    @app_commands.guild_only()
+    @coordinator.tracked
+    async def add_skin_slash(interaction: discord.Interaction, skin: str) -> None:
+        await interaction.response.defer()  # validation may need a Steam request
+        argument_validation_result = await validate_add_skin_argument(skin)
+        if not argument_validation_result.success:
+            await interaction.followup.send(argument_validation_result.text)
+            return
+
+        hash_name = argument_validation_result.data["hash_name"]
+        add_to_db_result = await db.tracked_skins.track_hash_name(
+            interaction.guild_id, hash_name
+        )
+        await interaction.followup.send(add_to_db_result.text)
+
+    @add_skin_slash.autocomplete("skin")
+    async def add_skin_autocomplete(
+        interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        return await complete_item_names(current)
+
+    @bot.tree.command(name="remove_skin", description="Stop tracking a skin's price.")
+    @app_commands.describe(skin="A skin tracked in this server")
+    @app_commands.guild_only()
+    @coordinator.tracked
+    async def remove_skin_slash(interaction: discord.Interaction, skin: str) -> None:
+        await interaction.response.defer()  # DB reads and writes follow
+        skin_ids = await db.tracked_skins.get_cached_tracked_skin_ids(
+            interaction.guild_id
+        )
+        skin_id = skin_names.get_id(skin)
+        if skin_id is not None and skin_id in skin_ids:
+            hash_name = skin  # picked from the autocomplete choices
+        else:
+            hash_name_result = await get_stored_hash_name(skin)
+            if not hash_name_result.success:
+                await interaction.followup.send(hash_name_result.text)
+                return
+            hash_name = hash_name_result.data["hash_name"]
+
+        untrack_result = await db.tracked_skins.untrack_hash_name(
+            interaction.guild_id, hash_name
+        )
+        await interaction.followup.send(untrack_result.text)
+
+    @remove_skin_slash.autocomplete("skin")
+    async def remove_skin_autocomplete(
+        interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        skin_ids = await db.tracked_skins.get_cached_tracked_skin_ids(
+            interaction.guild_id
+        )
+        current = current.casefold()
+        choices = []
+        for skin_id in skin_ids:
+            name = skin_names.get_plain_name(skin_id)
+            value = skin_names.get_hash_name(skin_id)
+            if current in name.casefold() and len(value) <= 100:
+                choices.append(app_commands.Choice(name=name, value=value))
+        return choices[:25]
+
+    @bot.tree.command(
+        name="tracked_skins", description="Show the skins tracked in this server."
+    )
+    @app_commands.guild_only()
+    @coordinator.tracked
+    async def tracked_skins_slash(interaction: discord.Interaction) -> None:
+        result = await db.tracked_skins.get_tracked_hash_names(interaction.guild_id)
+        await interaction.response.send_message(result.text)
+
+    @bot.tree.command(
+        name="set_currency", description="Set the currency prices are shown in."
+    )
+    @app_commands.choices(
+        currency=[app_commands.Choice(name=c, value=c) for c in CURRENCY_SYMBOLS]
+    )
+    @app_commands.guild_only()
+    @coordinator.tracked
+    async def set_currency_slash(
+        interaction: discord.Interaction, currency: str
+    ) -> None:
+        text = await set_guild_currency(interaction.guild_id, currency)
+        await interaction.response.send_message(text)
+
+    @bot.tree.command(
+        name="portfolio", description="Show the server's portfolio value."
+    )
+    @app_commands.guild_only()
+    @coordinator.tracked
+    async def portfolio_slash(interaction: discord.Interaction) -> None:
+        await interaction.response.defer()
+        rendered = await render_guild_portfolio(interaction.guild_id)
+        if isinstance(rendered, str):
+            await interaction.followup.send(rendered)
+            return
+        for group in group_embeds(rendered):
+            await interaction.followup.send(embeds=group)
+
+    @bot.tree.command(
+        name="price_history", description="Show a skin's price over the last days."
+    )
+    @app_commands.describe(skin="Skin name", days="Number of days, 30 by default")
+    @app_commands.guild_only()
+    @coordinator.tracked
+    async def price_history_slash(
+        interaction: discord.Interaction,
+        skin: str,
+        days: app_commands.Range[int, 1, 365] = PRICE_HISTORY_DAYS,
+    ) -> None:
+        await interaction.response.defer()  # months of history take a few reads
+        rendered = await render_price_history(interaction.guild_id, skin, days)
+        if isinstance(rendered, str):
+            await interaction.followup.send(rendered)
+            return
+        await interaction.followup.send(embed=rendered)
+
+    @price_history_slash.autocomplete("skin")
+    async def price_history_autocomplete(
+        interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        return await complete_item_names(current)
+
+    @bot.tree.command(
+        name="set_holding", description="Set how many of a skin the server holds."
+    )
+    @app_commands.describe(quantity="0 removes the skin", skin="Skin name")
+    @app_commands.guild_only()
+    @coordinator.tracked
+    async def set_holding_slash(
+        interaction: discord.Interaction,
+        quantity: app_commands.Range[int, 0],
+        skin: str,
+    ) -> None:
+        await interaction.response.defer()  # validation may need a Steam request
+        text = await set_guild_holding(interaction.guild_id, f"{quantity} {skin}")
+        await interaction.followup.send(text)
+
+    @set_holding_slash.autocomplete("skin")
+    async def set_holding_autocomplete(
+        interaction: discord.Interaction, current: str
+    ) -> list[app_commands.Choice[str]]:
+        return await complete_item_names(current)
+
     @bot.event
     async def on_ready() -> None:
+        nonlocal sync_commands, catch_up_started
+        if sync_commands:
+            # Syncing is rate limited by Discord, so it only happens on request
+            synced = await bot.tree.sync()
+            sync_commands = False
+            logger.info(f"{len(synced)} application commands synced")
         if not send_price_updates.is_running():
             send_price_updates.start()
             logger.info("send_price_updates loop started")
         if not shutdown_bot.is_running():
             shutdown_bot.start()
-            logger.info(f"bot will be shut down at {get_shutdown_time()}")
+            logger.info(f"bot will be shut down at {shutdown_time}")
+        if not catch_up_started:
+            # on_ready also fires on reconnects, catch up only once per invocation
+            catch_up_started = True
+            catch_up_price_updates.start()
         logger.info(f"Logged in as {bot.user.name} - {bot.user.id}")
+        # build the item name index ahead of the first autocomplete request
+        await asyncio.to_thread(get_item_index)
         return
 
     async with bot:
         await bot.start(DISCORD_TOKEN)
 
 
+def get_shard_ids(event) -> list[int] | None:
+    if config.SHARD_COUNT == 1:
+        return None
+    shard_ids = event.get("shard_ids") or config.SHARD_IDS
+    return shard_ids or list(range(config.SHARD_COUNT))
+
+
 def handler(event, context):
-    run_for = None  # default to no shutdown
+    shard_ids = get_shard_ids(event)
+    sync_commands = event.get("sync_commands") == True
+    shutdown_time = None  # default to no shutdown
     if event.get("lambda") == True:
         shutdown_time = get_shutdown_time()
-        run_for = (shutdown_time - datetime.now(timezone.utc)).total_seconds()
-    asyncio.run(run_bot_for(run_for - 2))  # shut down 2 seconds early
+
+    if shard_ids is None or shutdown_time is None:
+        asyncio.run(run_bot_for(shutdown_time, shard_ids, sync_commands))
+        return {"ok": True}
+
+    # Only one process may run a shard at a time. The lease outlives the
+    # shutdown by a few seconds, but expires before the next scheduled run.
+    owner = context.aws_request_id if context else str(uuid.uuid4())
+    lease_expires = int(shutdown_time.timestamp()) + 10
+    leases_result = db.shard_leases.acquire_leases(
+        shard_ids,
+        config.SHARD_COUNT,
+        owner,
+        int(datetime.now(timezone.utc).timestamp()),
+        lease_expires,
+    )
+    if not leases_result.success:
+        return {"ok": False, "text": leases_result.text}
+
+    try:
+        asyncio.run(run_bot_for(shutdown_time, shard_ids, sync_commands))
+    finally:
+        db.shard_leases.release_leases(shard_ids, config.SHARD_COUNT, owner)
     return {"ok": True}
 
 
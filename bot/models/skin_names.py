@@ -0,0 +1,83 @@
+import sys
+import threading
+from urllib.parse import unquote
+
+
+def abbreviate_wear(unquoted_hash_name: str) -> str:
+    abbreviations = {
+        "Factory New": "FN",
+        "Minimal Wear": "MW",
+        "Field-Tested": "FT",
+        "Well-Worn": "WW",
+        "Battle-Scarred": "BS",
+    }
+    for full, abbr in abbreviations.items():
+        if f"({full})" in unquoted_hash_name:
+            return unquoted_hash_name.replace(f"({full})", f"({abbr})")
+    return unquoted_hash_name
+
+
+class SkinNameTable:
+    """
+    Interns percent-encoded hash names as dense int ids (0, 1, 2, ...), so
+    in-memory indexes and price columns store small ints instead of strings.
+
+    The unquoted name and the display name (unquoted, wear abbreviated) of each
+    id are decoded once, on first use, and kept alongside.
+    """
+
+    __slots__ = ("ids", "hash_names", "plain_names", "display_names", "lock")
+
+    def __init__(self):
+        # broadcasts are planned in a worker thread while commands intern names
+        self.lock = threading.Lock()
+        self.ids: dict[str, int] = {}
+        self.hash_names: list[str] = []
+        self.plain_names: list[str | None] = []
+        self.display_names: list[str | None] = []
+
+    def __len__(self) -> int:
+        return len(self.hash_names)
+
+    def intern(self, hash_name: str) -> int:
+        skin_id = self.ids.get(hash_name)
+        if skin_id is not None:
+            return skin_id
+        with self.lock:
+            skin_id = self.ids.get(hash_name)
+            if skin_id is None:
+                skin_id = len(self.hash_names)
+                hash_name = sys.intern(hash_name)
+                self.hash_names.append(hash_name)
+                self.plain_names.append(None)
+                self.display_names.append(None)
+                self.ids[hash_name] = skin_id  # last, once the id is readable
+            return skin_id
+
+    def get_id(self, hash_name: str) -> int | None:
+        return self.ids.get(hash_name)
+
+    def get_hash_name(self, skin_id: int) -> str:
+        return self.hash_names[skin_id]
+
+    def get_plain_name(self, skin_id: int) -> str:
+        if self.plain_names[skin_id] is None:
+            self.plain_names[skin_id] = unquote(self.hash_names[skin_id])
+        return self.plain_names[skin_id]
+
+    def get_display_name(self, skin_id: int) -> str:
+        if self.display_names[skin_id] is None:
+            self.display_names[skin_id] = abbreviate_wear(self.get_plain_name(skin_id))
+        return self.display_names[skin_id]
+
+
+# Shared by every cache of the process: ids stay valid for its whole lifetime
+skin_names = SkinNameTable()
+
+
+def get_plain_name(hash_name: str) -> str:
+    return skin_names.get_plain_name(skin_names.intern(hash_name))
+
+
+def get_display_name(hash_name: str) -> str:
+    return skin_names.get_display_name(skin_names.intern(hash_name))
@@ -0,0 +1,43 @@
+from array import array
+
+from models.skin_names import SkinNameTable, skin_names
+
+
+class TrackingIndex:
+    """
+    In-memory index of tracked skins: guild -> skin ids.
+
+    Bulk loaded once, then kept up to date with `add` and `remove`, so the skins
+    of every guild are known without querying `skinsbot.tracked_skins`. Hash
+    names are interned in a SkinNameTable and stored as arrays of skin ids
+    (4 bytes per skin) rather than sets of strings.
+    """
+
+    def __init__(self, names: SkinNameTable = skin_names):
+        self.names = names
+        self.skin_ids_by_guild: dict[int, array] = {}
+
+    def add(self, guild_id: int, hash_name: str) -> None:
+        skin_id = self.names.intern(hash_name)
+        # (guild_id, hash_name) is the key of skinsbot.tracked_skins, so the bulk
+        # loader never adds a pair twice and appends stay O(1)
+        self.skin_ids_by_guild.setdefault(guild_id, array("I")).append(skin_id)
+
+    def contains(self, guild_id: int, hash_name: str) -> bool:
+        skin_id = self.names.get_id(hash_name)
+        return skin_id is not None and skin_id in self.get_skin_ids(guild_id)
+
+    def remove(self, guild_id: int, hash_name: str) -> None:
+        if not self.contains(guild_id, hash_name):
+            return
+        skin_ids = self.skin_ids_by_guild[guild_id]
+        skin_ids.remove(self.names.get_id(hash_name))
+        if not skin_ids:
+            del self.skin_ids_by_guild[guild_id]
+
+    def get_skin_ids(self, guild_id: int) -> array:
+        return self.skin_ids_by_guild.get(guild_id, array("I"))
+
+    def __len__(self) -> int:
+        # number of (guild, hash name) pairs
+        return sum(len(skin_ids) for skin_ids in self.skin_ids_by_guild.values())
@@ -0,0 +1,200 @@
+from array import array
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, time, timezone
+from decimal import Decimal
+import logging
+
+from config import MAX_PRICE_AGE_SECONDS
+from db.broadcast_ledger import (
+    STATUS_NO_CHANNEL,
+    STATUS_SENT,
+    STATUS_UNREACHABLE,
+    claim_guild,
+    release_claims,
+    settle_guilds,
+)
+from db.guild_info import get_all_guild_info_or_raise
+from db.skins_prices import get_latest_prices_or_raise
+from db.tracked_skins import get_tracking_index_or_raise
+from models.result import Result
+from models.skin_names import skin_names
+from services.send_queue import SENT, UNREACHABLE
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BROADCAST_TIME = time(19, 5)  # UTC
+# settled guilds are recorded in the ledger every LEDGER_BATCH guilds
+LEDGER_BATCH = 25
+# claim duration when the process has no shutdown time
+DEFAULT_CLAIM_SECONDS = 15 * 60
+NO_PRICE = -1
+
+
+@dataclass(slots=True)
+class GuildBroadcast:
+    guild_id: int
+    channel_id: int
+    currency: str | None
+    skin_ids: tuple[int, ...]  # sorted, ids from models.skin_names.skin_names
+
+
+@dataclass
+class BroadcastPlan:
+    guilds: list[GuildBroadcast] = field(default_factory=list)
+    # owed the update but without a channel to send it to
+    no_channel_guild_ids: list[int] = field(default_factory=list)
+    # price_cents[skin_id]: latest price in US cents, NO_PRICE if there is no
+    # price from the last 24h (8 bytes per skin instead of a dict entry + Decimal)
+    price_cents: array = field(default_factory=lambda: array("q"))
+
+    def get_price_usd(self, skin_id: int) -> Decimal | None:
+        if skin_id >= len(self.price_cents) or self.price_cents[skin_id] == NO_PRICE:
+            return None
+        return Decimal(self.price_cents[skin_id]) / 100
+
+    def get_skin_prices(
+        self, guild: GuildBroadcast
+    ) -> tuple[tuple[int, Decimal | None], ...]:
+        return tuple((i, self.get_price_usd(i)) for i in guild.skin_ids)
+
+
+def plan_broadcast_or_raise(guild_ids: set[int]) -> BroadcastPlan:
+    """
+    Plan the daily broadcast for `guild_ids` (the guilds this process sees).
+
+    Instead of a few queries per guild, the guild info is bulk loaded with a
+    paginated scan, the tracked skins come from the process' tracking index
+    (bulk loaded by its first broadcast), then the prices of every skin tracked by
+    the planned guilds are read in batches of 100: a constant number of round
+    trips, and O(total rows) work in memory.
+    """
+    guild_infos = get_all_guild_info_or_raise()
+    plan = BroadcastPlan()
+    # no channel set, can't send updates
+    plan.no_channel_guild_ids = [
+        guild_id
+        for guild_id in guild_ids
+        if guild_infos.get(guild_id, {}).get("channel_id") is None
+    ]
+    guild_ids = set(guild_ids) - set(plan.no_channel_guild_ids)
+    if not guild_ids:
+        return plan  # nothing owed, skip the bigger reads
+
+    tracking_index = get_tracking_index_or_raise()
+    for guild_id in guild_ids:
+        plan.guilds.append(
+            GuildBroadcast(
+                guild_id=guild_id,
+                channel_id=int(guild_infos[guild_id]["channel_id"]),
+                currency=guild_infos[guild_id].get("currency"),
+                skin_ids=tuple(sorted(tracking_index.get_skin_ids(guild_id))),
+            )
+        )
+
+    skin_ids = {i for guild in plan.guilds for i in guild.skin_ids}
+    hash_names = [skin_names.get_hash_name(i) for i in skin_ids]
+    latest_prices = get_latest_prices_or_raise(hash_names)
+    min_refresh = get_unix_now() - MAX_PRICE_AGE_SECONDS
+    # sized by the planned skins only, not by everything the process interned
+    plan.price_cents = array("q", [NO_PRICE]) * (max(skin_ids, default=-1) + 1)
+    for skin_id, hash_name in zip(skin_ids, hash_names):
+        stats = latest_prices.get(hash_name, {})
+        if stats.get("last_price") is None:
+            continue
+        if int(stats.get("last_refresh", 0)) > min_refresh:
+            plan.price_cents[skin_id] = int(round(stats["last_price"] * 100))
+
+    logger.info(f"Broadcast planned: {len(plan.guilds)} guilds, {len(skin_ids)} skins")
+    return plan
+
+
+async def plan_broadcast(guild_ids: set[int]) -> Result:
+    try:
+        plan = await asyncio.to_thread(plan_broadcast_or_raise, guild_ids)
+        return Result(success=True, data={"plan": plan})
+
+    except Exception as e:
+        text = "Failed to plan broadcast."
+        exception_text = f"{type(e).__name__}: {e}"
+        logger.error(f"{text} {exception_text}")
+        return Result(success=False, text=text)
+
+
+def get_unix_now() -> int:
+    return int(datetime.now(timezone.utc).timestamp())
+
+
+def get_broadcast_date() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def is_broadcast_due() -> bool:
+    return datetime.now(timezone.utc).time() >= BROADCAST_TIME
+
+
+class BroadcastLedger:
+    """
+    One process' view of the delivery ledger (`skinsbot.broadcast_ledger`).
+
+    A guild's update is claimed with a conditional write before it is queued,
+    so no two processes send it, and the guild is settled (in batches) once all
+    its messages are sent, or once it turns out it can't be sent to (no channel,
+    or a deleted or forbidden one) so later invocations don't retry it. Claims of
+    updates that weren't sent, because sending failed or the bot is shutting
+    down, are released for the next invocation.
+    """
+
+    def __init__(self, broadcast_date: str, owner: str, claim_expires: int | None):
+        # claims must outlive the process, but expire before the next one starts
+        self.broadcast_date = broadcast_date
+        self.owner = owner
+        self.claim_expires = claim_expires
+        self.claimed: set[int] = set()
+        self.pending: dict[int, str] = {}  # {guild_id: terminal status}
+
+    async def claim(self, guild_id: int) -> bool:
+        unix_now = get_unix_now()
+        claim_expires = self.claim_expires or unix_now + DEFAULT_CLAIM_SECONDS
+        result = await claim_guild(
+            self.broadcast_date, guild_id, self.owner, unix_now, claim_expires
+        )
+        if result.success:
+            self.claimed.add(guild_id)
+        return result.success
+
+    def settle(self, guild_id: int, status: str) -> None:
+        self.claimed.discard(guild_id)
+        self.pending[guild_id] = status
+
+    def record(self, guild_id: int, outcome: str) -> None:
+        # SendQueue.put_all callback. An update that failed otherwise stays
+        # claimed and is released by `close`, so the next invocation retries it
+        if outcome == SENT:
+            self.settle(guild_id, STATUS_SENT)
+        elif outcome == UNREACHABLE:
+            self.settle(guild_id, STATUS_UNREACHABLE)
+        else:
+            logger.info(f"Broadcast to guild {guild_id} failed, not marked as sent")
+
+    def record_no_channel(self, guild_ids: list[int]) -> None:
+        for guild_id in guild_ids:
+            self.settle(guild_id, STATUS_NO_CHANNEL)
+
+    async def flush(self) -> None:
+        if not self.pending:
+            return
+        statuses, self.pending = self.pending, {}
+        result = await settle_guilds(
+            self.broadcast_date, statuses, self.owner, get_unix_now()
+        )
+        if not result.success:
+            self.pending |= statuses  # retried on the next flush
+
+    async def close(self) -> None:
+        await self.flush()
+        if self.claimed:
+            await release_claims(self.broadcast_date, self.claimed)
+            logger.info(f"{len(self.claimed)} unsent broadcast claims released")
+            self.claimed = set()
@@ -0,0 +1,86 @@
+from decimal import ROUND_HALF_UP, Decimal
+import logging
+import time
+
+from db.exceptions import FxRatesTooOldError
+from db.fx_rates import get_latest_fx_rates_or_raise
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_CURRENCY = "USD"
+CURRENCY_SYMBOLS = {
+    "USD": "$",
+    "EUR": "€",
+    "BRL": "R$",
+    "GBP": "£",
+    "PLN": "zł",
+    "TRY": "₺",
+    "CAD": "CA$",
+    "AUD": "A$",
+}
+FX_CACHE_TTL_SECONDS = 3600
+
+# (expires_at, {currency: units per 1 USD}), shared by the whole process
+fx_rates_cache = (0.0, {})
+
+
+def get_fx_rates() -> dict[str, Decimal]:
+    """
+    USD exchange rates, read from the DB at most once an hour per process (the
+    workers refresh them a few times a day). Returns the previously read rates,
+    or {}, if the read fails, and {} if the stored rates are too old, in which
+    case prices are shown in USD.
+    """
+    global fx_rates_cache
+    expires_at, rates = fx_rates_cache
+    if expires_at > time.monotonic():
+        return rates
+
+    try:
+        rates = get_latest_fx_rates_or_raise()
+    except FxRatesTooOldError as e:
+        logger.error(f"Showing prices in USD. {e}")
+        rates = {}
+    except Exception as e:
+        logger.error(f"Failed to get FX rates. {type(e).__name__}: {e}")
+    fx_rates_cache = (time.monotonic() + FX_CACHE_TTL_SECONDS, rates)
+    return rates
+
+
+def resolve_currency(currency: str | None, fx_rates: dict[str, Decimal]) -> str:
+    # Falls back to USD for unknown currencies or when there is no rate for it
+    if currency in CURRENCY_SYMBOLS and (currency == "USD" or currency in fx_rates):
+        return currency
+    return DEFAULT_CURRENCY
+
+
+def convert_usd(
+    amount_usd: Decimal, currency: str, fx_rates: dict[str, Decimal]
+) -> Decimal:
+    rate = Decimal(1) if currency == "USD" else Decimal(fx_rates[currency])
+    return (Decimal(amount_usd) * rate).quantize(Decimal("0.01"), ROUND_HALF_UP)
+
+
+def format_price(amount: Decimal, currency: str) -> str:
+    return f"{CURRENCY_SYMBOLS[currency]}{amount:,.2f}"
+
+
+class PriceFormatter:
+    """
+    Formats USD amounts in `currency`, e.g. PriceFormatter("EUR", rates)(Decimal(3))
+    -> "€2.76". Unknown currencies, or ones without a rate, fall back to USD.
+    """
+
+    def __init__(self, currency: str | None, fx_rates: dict[str, Decimal]):
+        self.currency = resolve_currency(currency, fx_rates)
+        self.fx_rates = fx_rates
+
+    def __call__(self, amount_usd: Decimal) -> str:
+        return format_price(
+            convert_usd(amount_usd, self.currency, self.fx_rates), self.currency
+        )
+
+    def change(self, amount_usd: Decimal) -> str:
+        sign = "+" if amount_usd >= 0 else "-"
+        return sign + self(abs(amount_usd))
@@ -0,0 +1,171 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+import functools
+import logging
+import os
+
+import boto3
+
+import config
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+s3_client = boto3.client("s3")
+
+# Trigrams shared by more than this share of all names ("(fi", "ld-", ...) carry
+# little signal and would make every lookup scan most of the index
+MAX_TRIGRAM_SHARE = 0.05
+MIN_MAX_POSTINGS = 200
+MIN_SUGGESTION_SCORE = 0.6
+# share of the typed trigrams a name must contain to be offered as a completion
+MIN_COMPLETION_COVERAGE = 0.8
+
+
+def normalize(name: str) -> str:
+    name = name.replace("™", "").casefold()
+    return " ".join(name.split())
+
+
+def get_trigrams(normalized_name: str, padded: bool = True) -> set[str]:
+    # padding marks the start and end of the name
+    if padded:
+        normalized_name = f"  {normalized_name} "
+    return {normalized_name[i : i + 3] for i in range(len(normalized_name) - 2)}
+
+
+class ItemNameIndex:
+    """
+    In-memory index of CS2 market hash names (plain text, not percent-encoded).
+
+    `lookup` resolves names that only differ in case, spacing or the ™ symbol;
+    `suggest` ranks names by trigram similarity (Dice coefficient over the
+    informative trigrams), using an inverted index from trigram to name ids so
+    only candidates are scored.
+    """
+
+    def __init__(self, names: list[str]):
+        self.names = names
+        self.exact = {}
+        postings = {}
+        normalized_names = []
+        for name_id, name in enumerate(names):
+            normalized = normalize(name)
+            normalized_names.append(normalized)
+            self.exact.setdefault(normalized, name_id)
+            for trigram in get_trigrams(normalized):
+                postings.setdefault(trigram, []).append(name_id)
+
+        max_postings = max(MIN_MAX_POSTINGS, int(len(names) * MAX_TRIGRAM_SHARE))
+        self.postings = {
+            trigram: array("I", ids)
+            for trigram, ids in postings.items()
+            if len(ids) <= max_postings
+        }
+        # name ids in normalized order, for prefix completion
+        self.sorted_ids = array(
+            "I", sorted(range(len(names)), key=normalized_names.__getitem__)
+        )
+        # number of indexed (i.e. informative) trigrams per name, for scoring
+        self.trigram_counts = array("H", [0] * len(names))
+        for ids in self.postings.values():
+            for name_id in ids:
+                self.trigram_counts[name_id] += 1
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, name: str) -> str | None:
+        name_id = self.exact.get(normalize(name))
+        return None if name_id is None else self.names[name_id]
+
+    def count_shared_trigrams(
+        self, normalized: str, padded: bool = True
+    ) -> tuple[set[str], Counter]:
+        trigrams = get_trigrams(normalized, padded) & self.postings.keys()
+        shared = Counter()
+        for trigram in trigrams:
+            shared.update(self.postings[trigram])
+        return trigrams, shared
+
+    def complete(self, text: str, limit: int = 25) -> list[str]:
+        """
+        Names starting with `text`, then names containing most of its trigrams
+        (so "redline" finds "AK-47 | Redline (Field-Tested)").
+        """
+        prefix = normalize(text)
+        key = lambda name_id: normalize(self.names[name_id])
+        start = bisect_left(self.sorted_ids, prefix, key=key)
+        matches = []
+        for name_id in self.sorted_ids[start : start + limit]:
+            if not key(name_id).startswith(prefix):
+                break
+            matches.append(name_id)
+
+        if len(matches) < limit and len(prefix) >= 3:
+            # unpadded: the typed text may start or stop in the middle of a word
+            trigrams, shared = self.count_shared_trigrams(prefix, padded=False)
+            covering = [
+                name_id
+                for name_id, count in shared.most_common()
+                if count >= MIN_COMPLETION_COVERAGE * len(trigrams)
+                and name_id not in matches
+            ]
+            covering.sort(
+                key=lambda name_id: (-shared[name_id], len(self.names[name_id]))
+            )
+            matches += covering[: limit - len(matches)]
+
+        return [self.names[name_id] for name_id in matches]
+
+    def suggest(self, name: str, limit: int = 3) -> list[str]:
+        normalized = normalize(name)
+        trigrams, shared = self.count_shared_trigrams(normalized)
+
+        candidates = [
+            name_id
+            for name_id, count in shared.items()
+            if 2 * count / (len(trigrams) + self.trigram_counts[name_id])
+            >= MIN_SUGGESTION_SCORE
+        ]
+        # Common trigrams (e.g. the wear) aren't indexed, so the few candidates
+        # left are reranked on the full names
+        candidates.sort(
+            key=lambda name_id: SequenceMatcher(
+                None, normalized, normalize(self.names[name_id])
+            ).ratio(),
+            reverse=True,
+        )
+        return [self.names[name_id] for name_id in candidates[:limit]]
+
+
+def load_item_names() -> list[str]:
+    """
+    Load the names refreshed by the workers from S3, falling back to the file
+    bundled at deploy time. Returns [] if neither is available.
+    """
+    if config.ITEM_NAMES_BUCKET:
+        try:
+            response = s3_client.get_object(
+                Bucket=config.ITEM_NAMES_BUCKET, Key=config.ITEM_NAMES_KEY
+            )
+            return response["Body"].read().decode().splitlines()
+
+        except Exception as e:
+            logger.error(f"Failed to load item names from S3. {e}")
+
+    if os.path.exists(config.ITEM_NAMES_FILE):
+        with open(config.ITEM_NAMES_FILE, encoding="utf-8") as f:
+            return f.read().splitlines()
+
+    logger.info("No item names available, fuzzy matching disabled")
+    return []
+
+
+@functools.cache
+def get_item_index() -> ItemNameIndex:
+    names = [name for name in load_item_names() if name]
+    index = ItemNameIndex(names)
+    logger.info(f"Item name index built with {len(index)} names")
+    return index
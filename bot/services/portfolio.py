@@ -0,0 +1,62 @@
+from dataclasses import dataclass, field
+from decimal import Decimal
+import time
+
+from config import MAX_PRICE_AGE_SECONDS
+
+
+@dataclass
+class PortfolioLine:
+    hash_name: str
+    quantity: int
+    price_usd: Decimal | None = None
+    value_usd: Decimal | None = None
+    daily_change_usd: Decimal | None = None
+
+
+@dataclass
+class PortfolioValuation:
+    lines: list[PortfolioLine] = field(default_factory=list)
+    total_usd: Decimal = Decimal(0)
+    daily_change_usd: Decimal = Decimal(0)
+    # value yesterday of the skins that have a price for both days
+    previous_total_usd: Decimal = Decimal(0)
+    n_unpriced: int = 0
+
+
+def value_portfolio(
+    holdings: dict[str, int], latest_prices: dict[str, dict]
+) -> PortfolioValuation:
+    """
+    Value every holding and accumulate the totals in a single pass.
+
+    `latest_prices` is the output of db.skins_prices.get_latest_prices_or_raise;
+    skins without a price from the last 24h (same rule as the daily broadcast)
+    are listed but left out of the totals.
+    """
+    min_refresh = int(time.time()) - MAX_PRICE_AGE_SECONDS
+    valuation = PortfolioValuation()
+    for hash_name, quantity in holdings.items():
+        line = PortfolioLine(hash_name=hash_name, quantity=quantity)
+        valuation.lines.append(line)
+
+        prices = latest_prices.get(hash_name, {})
+        price = prices.get("last_price")
+        if price is None or int(prices.get("last_refresh", 0)) <= min_refresh:
+            valuation.n_unpriced += 1
+            continue
+
+        line.price_usd = price
+        line.value_usd = price * quantity
+        valuation.total_usd += line.value_usd
+
+        prev_price = prices.get("prev_day_price")
+        if prev_price is not None:
+            line.daily_change_usd = (price - prev_price) * quantity
+            valuation.daily_change_usd += line.daily_change_usd
+            valuation.previous_total_usd += prev_price * quantity
+
+    valuation.lines.sort(
+        key=lambda line: (line.value_usd is None, -(line.value_usd or 0))
+    )
+    return valuation
@@ -0,0 +1,184 @@
+import asyncio
+from collections import deque
+import logging
+import time
+
+import discord
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# https://discord.com/developers/docs/topics/rate-limits
+GLOBAL_RATE = (45, 1.0)  # requests per second, a bit under Discord's 50
+CHANNEL_RATE = (5, 5.0)  # messages per 5 seconds in a channel
+MAX_CONCURRENT_SENDS = 8
+MAX_ATTEMPTS = 4
+# on an error or a cancellation, units already being sent get this long to finish
+ABORT_TIMEOUT_SECONDS = 2
+# outcomes of a unit, passed to its `on_done`
+SENT = "sent"
+UNREACHABLE = "unreachable"  # deleted channel or missing permissions, final
+FAILED = "failed"  # may succeed if retried later
+
+
+class RateLimiter:
+    """
+    Sliding window limiter: at most `limit` acquisitions per `period` seconds.
+    """
+
+    def __init__(self, limit: int, period: float):
+        self.limit = limit
+        self.period = period
+        self.times = deque()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            while self.times and now - self.times[0] >= self.period:
+                self.times.popleft()
+
+            if len(self.times) < self.limit:
+                self.times.append(now)
+                return
+            await asyncio.sleep(self.times[0] + self.period - now)
+
+
+class SendQueue:
+    """
+    Outbound message queue for broadcasts.
+
+    Messages are sent by MAX_CONCURRENT_SENDS workers, paced by a global and a
+    per-channel limiter, in order within each channel. Channels missing from the
+    cache are fetched; 5xx responses are retried with backoff, while 429s are
+    left to discord.py, which waits out its rate limit buckets itself. A failing
+    channel only drops its own messages, never the whole broadcast.
+
+    Usage:
+        async with SendQueue(bot) as send_queue:
+            await send_queue.put(channel_id, embed=embed)
+            await send_queue.put_all(channel_id, messages, on_done=callback)
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self.queue = asyncio.Queue(maxsize=MAX_CONCURRENT_SENDS * 4)
+        self.global_limiter = RateLimiter(*GLOBAL_RATE)
+        self.channel_limiters = {}
+        self.channel_locks = {}
+        self.channels = {}
+        self.unreachable_channel_ids = set()
+        self.workers = []
+        self.busy_workers = set()
+        self.closing = False
+        self.n_sent = 0
+        self.n_failed = 0
+
+    async def __aenter__(self):
+        self.workers = [
+            asyncio.create_task(self.worker()) for _ in range(MAX_CONCURRENT_SENDS)
+        ]
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.queue.join()
+        else:
+            # Queued units are dropped, but one a worker already started is
+            # finished so a channel never gets half of it
+            self.closing = True
+            for worker in self.workers:
+                if worker not in self.busy_workers:
+                    worker.cancel()
+            if self.busy_workers:
+                await asyncio.wait(
+                    set(self.busy_workers), timeout=ABORT_TIMEOUT_SECONDS
+                )
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        logger.info(f"SendQueue done: sent={self.n_sent} failed={self.n_failed}")
+
+    async def put(self, channel_id: int, **send_kwargs) -> None:
+        await self.put_all(channel_id, [send_kwargs])
+
+    async def put_all(
+        self, channel_id: int, messages: list[dict], on_done=None
+    ) -> None:
+        """
+        Queue `messages` (send kwargs) for one channel as a unit. One worker sends
+        them in order, stops at the first failure and then calls
+        `on_done(outcome)` with SENT, UNREACHABLE or FAILED.
+        Blocks while the queue is full, so producers can't run far ahead.
+        """
+        await self.queue.put((channel_id, messages, on_done))
+
+    async def worker(self) -> None:
+        while not self.closing:
+            channel_id, messages, on_done = await self.queue.get()
+            self.busy_workers.add(asyncio.current_task())
+            try:
+                outcome = await self.send_all(channel_id, messages)
+            finally:
+                self.busy_workers.discard(asyncio.current_task())
+                self.queue.task_done()
+            if on_done is not None:
+                on_done(outcome)
+
+    async def send_all(self, channel_id: int, messages: list[dict]) -> str:
+        try:
+            lock = self.channel_locks.setdefault(channel_id, asyncio.Lock())
+            async with lock:
+                for send_kwargs in messages:
+                    if not await self.send(channel_id, send_kwargs):
+                        return UNREACHABLE
+            return SENT
+
+        except Exception as e:
+            self.n_failed += 1
+            logger.error(
+                f"Failed to send to channel_id={channel_id}. {type(e).__name__}: {e}"
+            )
+            return FAILED
+
+    async def get_channel(self, channel_id: int):
+        channel = self.channels.get(channel_id) or self.bot.get_channel(channel_id)
+        if channel is None:
+            await self.global_limiter.acquire()
+            channel = await self.bot.fetch_channel(channel_id)
+        self.channels[channel_id] = channel
+        return channel
+
+    async def send(self, channel_id: int, send_kwargs: dict) -> bool:
+        # False if the channel is unreachable, raises if sending keeps failing
+        if channel_id in self.unreachable_channel_ids:
+            self.n_failed += 1
+            return False
+
+        limiter = self.channel_limiters.setdefault(
+            channel_id, RateLimiter(*CHANNEL_RATE)
+        )
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                channel = await self.get_channel(channel_id)
+                await limiter.acquire()
+                await self.global_limiter.acquire()
+                await channel.send(**send_kwargs)
+                self.n_sent += 1
+                return True
+
+            except (discord.Forbidden, discord.NotFound) as e:
+                # deleted channel or missing permissions: retrying won't help
+                self.unreachable_channel_ids.add(channel_id)
+                self.n_failed += 1
+                logger.info(f"Channel {channel_id} is unreachable. {e}")
+                return False
+
+            except discord.HTTPException as e:
+                if attempt == MAX_ATTEMPTS or e.status < 500:
+                    raise
+                backoff = 2**attempt
+                logger.info(
+                    f"Send to channel_id={channel_id} got {e.status}, "
+                    f"retrying in {backoff}s (attempt {attempt})"
+                )
+                await asyncio.sleep(backoff)
@@ -0,0 +1,85 @@
+import asyncio
+from contextlib import asynccontextmanager
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# New work is refused this long before the shutdown time, leaving in-flight
+# commands and broadcasts time to finish
+DRAIN_SECONDS = 20
+# what is still running this long before the shutdown time is cancelled
+CANCEL_MARGIN_SECONDS = 4
+
+
+class ShutdownCoordinator:
+    """
+    Tracks the tasks doing work (commands, broadcasts) so the bot can stop
+    accepting new work, let in-flight work finish and cancel what is left before
+    the lambda is shut down. Cancelled work is expected to checkpoint itself (see
+    services.broadcast.BroadcastLedger).
+    """
+
+    def __init__(self):
+        self.accepting = True
+        self.in_flight: set[asyncio.Task] = set()
+
+    def begin(self) -> None:
+        self.in_flight.add(asyncio.current_task())
+
+    def end(self) -> None:
+        self.in_flight.discard(asyncio.current_task())
+
+    @asynccontextmanager
+    async def track(self):
+        self.begin()
+        try:
+            yield
+        finally:
+            self.end()
+
+    def tracked(self, func):
+        # Decorates a command callback, which runs in a task of its own, so the
+        # command is in flight until it returns
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with self.track():
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    async def run(self, coro) -> None:
+        """
+        Run `coro` in a task of its own, in flight until it returns. Used for work
+        started by long-lived tasks (e.g. a tasks.loop), which never finish and
+        would otherwise hold the drain for its whole timeout.
+        """
+        task = asyncio.create_task(coro)
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+        try:
+            await task
+        except asyncio.CancelledError:
+            # the drain cancelled the work, the task awaiting it carries on
+            if asyncio.current_task().cancelling():
+                raise
+
+    def stop_accepting(self) -> None:
+        self.accepting = False
+        logger.info(f"Not accepting new work, {len(self.in_flight)} tasks in flight")
+
+    async def drain(self, timeout: float) -> None:
+        # Waits for in-flight tasks up to `timeout`, then cancels the rest
+        if self.in_flight:
+            await asyncio.wait(set(self.in_flight), timeout=max(timeout, 0))
+
+        pending = {task for task in self.in_flight if not task.done()}
+        if not pending:
+            logger.info("All in-flight work finished")
+            return
+        logger.info(f"Cancelling {len(pending)} in-flight tasks")
+        for task in pending:
+            task.cancel()
+        # cancelled tasks may still checkpoint in their `finally`
+        await asyncio.wait(pending, timeout=CANCEL_MARGIN_SECONDS - 1)
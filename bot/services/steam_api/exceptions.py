@@ -20,3 +20,7 @@ class SteamMarketRequestError(Exception):
         "This is usually a temporary Steam Market/API issue — please try again in a bit.\n"
         "You can also double-check the spelling/format (see `->formatting_help`)."
     )
+
+
+class UnknownItemNameError(Exception):
+    pass
@@ -1,15 +1,18 @@
 import asyncio
 import logging
+import re
 from urllib.parse import quote, unquote, urlparse
 
 import requests
 from requests.exceptions import JSONDecodeError, RequestException
 
 from models.result import Result
+from services.item_index import get_item_index, normalize
 from services.steam_api.exceptions import (
     InvalidSteamMarketListingsUrlError,
     NoActiveListingsError,
     SteamMarketRequestError,
+    UnknownItemNameError,
     UnsuccessfulRequestError,
 )
 
@@ -17,6 +20,12 @@ from services.steam_api.exceptions import (
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# A name within this many edits of a known one is rejected as a typo without
+# asking Steam. The index only holds items listed at the last weekly crawl, so
+# merely similar names (a new tournament's stickers, a (Holo) variant) may be
+# real items.
+MAX_TYPO_EDITS = 2
+
 
 def translate_wear_abbreviation_to_full(command_argument: str) -> str:
     abbreviations = {
@@ -65,9 +74,23 @@ def get_hash_name_or_raise(command_argument: str) -> str:
     raise InvalidSteamMarketListingsUrlError("Invalid Steam Market URL.")
 
 
-def get_hash_name(command_argument: str) -> Result:
+def get_stored_hash_name_or_raise(command_argument: str) -> str:
+    """
+    The hash name ->add_skin stores for `command_argument`: resolved the same way
+    (link, wear abbreviations, then the item index, ignoring case, spacing and
+    the ™ symbol) but without asking Steam, as it only has to match stored names.
+    """
+    hash_name = get_hash_name_or_raise(command_argument)
+    index = get_item_index()
+    resolved = index.lookup(unquote(hash_name)) if index else None
+    return hash_name if resolved is None else quote(resolved)
+
+
+async def get_stored_hash_name(command_argument: str) -> Result:
     try:
-        hash_name = get_hash_name_or_raise(command_argument)
+        hash_name = await asyncio.to_thread(
+            get_stored_hash_name_or_raise, command_argument
+        )
         return Result(success=True, data={"hash_name": hash_name})
 
     except InvalidSteamMarketListingsUrlError as e:
@@ -129,14 +152,81 @@ def validate_listings_response_or_raise(listings_response: dict) -> None:
         )
 
 
+def render_did_you_mean_msg(name: str, suggestions: list[str]) -> str:
+    return f":cross_mark: Couldn't find `{name}`. Did you mean:\n* " + "\n* ".join(
+        f"`{suggestion}`" for suggestion in suggestions
+    )
+
+
+def get_edit_distance(a: str, b: str) -> int:
+    # Levenshtein distance, one row at a time
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(
+                min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                )
+            )
+        previous = current
+    return previous[-1]
+
+
+def is_near_certain_typo(name: str, known_name: str) -> bool:
+    a, b = normalize(name), normalize(known_name)
+    if re.findall(r"\d+", a) != re.findall(r"\d+", b):
+        return False  # another year, capsule or case number: likely a real item
+    if abs(len(a) - len(b)) > MAX_TYPO_EDITS:
+        return False
+    return get_edit_distance(a, b) <= MAX_TYPO_EDITS
+
+
+def get_suggestions(hash_name: str) -> list[str]:
+    return get_item_index().suggest(unquote(hash_name))
+
+
+def resolve_hash_name_locally_or_raise(hash_name: str) -> str | None:
+    """
+    Check `hash_name` against the local item name index.
+
+    Returns the canonical hash name if the index knows it (ignoring case, spacing
+    and the ™ symbol), raises UnknownItemNameError if it is a near-certain typo
+    of a known name, and returns None otherwise (e.g. an item newer than the
+    index), in which case Steam has to be asked.
+    """
+    index = get_item_index()
+    if not index:
+        return None
+
+    name = unquote(hash_name)
+    resolved = index.lookup(name)
+    if resolved is not None:
+        return quote(resolved)
+
+    typos_of = [s for s in index.suggest(name) if is_near_certain_typo(name, s)]
+    if typos_of:
+        raise UnknownItemNameError(render_did_you_mean_msg(name, typos_of))
+    return None
+
+
 async def validate_add_skin_argument(command_argument: str) -> Result:
     try:
         hash_name = get_hash_name_or_raise(command_argument)
+        resolved_hash_name = await asyncio.to_thread(
+            resolve_hash_name_locally_or_raise, hash_name
+        )
+        if resolved_hash_name is not None:
+            # the index only holds names that had active listings, no need for Steam
+            return Result(success=True, data={"hash_name": resolved_hash_name})
+
         listings_response = await asyncio.to_thread(get_listings_or_raise, hash_name)
         validate_listings_response_or_raise(listings_response)
         return Result(success=True, data={"hash_name": hash_name})
 
-    except InvalidSteamMarketListingsUrlError as e:
+    except (InvalidSteamMarketListingsUrlError, UnknownItemNameError) as e:
         return Result(success=False, text=str(e))
 
     except (JSONDecodeError, RequestException) as e:
@@ -151,6 +241,11 @@ async def validate_add_skin_argument(command_argument: str) -> Result:
         return Result(success=False, text=e.text)
 
     except NoActiveListingsError as e:
+        # Steam confirmed there's no such listing, now suggestions are worth showing
+        suggestions = await asyncio.to_thread(get_suggestions, hash_name)
+        if suggestions:
+            text = render_did_you_mean_msg(unquote(hash_name), suggestions)
+            return Result(success=False, text=text)
         return Result(success=False, text=str(e))
 
     except Exception as e:
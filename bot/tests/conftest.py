@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The bot imports its packages as top-level modules (as in the Lambda zip), and
+# creates its boto3 clients at import time, which needs a region
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -0,0 +1,147 @@
+import asyncio
+
+import pytest
+
+import db.broadcast_ledger as broadcast_ledger
+from db.broadcast_ledger import (
+    STATUS_CLAIMED,
+    STATUS_NO_CHANNEL,
+    STATUS_SENT,
+    STATUS_UNREACHABLE,
+)
+from models.result import Result
+import services.broadcast as broadcast
+from services.broadcast import BroadcastLedger
+from services.send_queue import FAILED, SENT, UNREACHABLE
+
+DATE = "2026-01-05"
+
+
+class FakeLedger:
+    """
+    The ledger rows of one day, {guild_id: row}, behind the async db functions
+    services.broadcast uses; the claim condition is evaluated like DynamoDB's.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self.fail_settles = 0
+
+    async def claim_guild(self, date, guild_id, owner, unix_now, claim_expires):
+        row = self.rows.get(guild_id)
+        if row and not (
+            row["status"] == STATUS_CLAIMED and row["claim_expires"] < unix_now
+        ):
+            return Result(success=False, text="already claimed")
+        self.rows[guild_id] = {
+            "status": STATUS_CLAIMED,
+            "owner": owner,
+            "claim_expires": claim_expires,
+        }
+        return Result(success=True)
+
+    async def settle_guilds(self, date, statuses, owner, unix_now):
+        if self.fail_settles:
+            self.fail_settles -= 1
+            return Result(success=False, text="throttled")
+        for guild_id, status in statuses.items():
+            self.rows[guild_id] = {"status": status, "owner": owner, "claim_expires": 0}
+        return Result(success=True)
+
+    async def release_claims(self, date, guild_ids):
+        for guild_id in guild_ids:
+            del self.rows[guild_id]
+        return Result(success=True)
+
+    def get_statuses(self):
+        return {guild_id: row["status"] for guild_id, row in self.rows.items()}
+
+
+@pytest.fixture
+def ledger(monkeypatch):
+    ledger = FakeLedger()
+    for name in ("claim_guild", "settle_guilds", "release_claims"):
+        monkeypatch.setattr(broadcast, name, getattr(ledger, name))
+    return ledger
+
+
+def test_a_guild_is_claimed_by_one_process_only(ledger):
+    async def main():
+        first = BroadcastLedger(DATE, "a", claim_expires=None)
+        second = BroadcastLedger(DATE, "b", claim_expires=None)
+        return await first.claim(1), await second.claim(1)
+
+    assert asyncio.run(main()) == (True, False)
+
+
+def test_an_expired_claim_can_be_taken_over(ledger):
+    async def main():
+        await BroadcastLedger(DATE, "a", claim_expires=100).claim(1)
+        return await BroadcastLedger(DATE, "b", claim_expires=None).claim(1)
+
+    assert asyncio.run(main())
+    assert ledger.rows[1]["owner"] == "b"
+
+
+def test_close_settles_the_recorded_guilds_and_releases_the_others(ledger):
+    async def main():
+        process = BroadcastLedger(DATE, "a", claim_expires=None)
+        for guild_id in (1, 2, 3):
+            await process.claim(guild_id)
+        process.record(1, SENT)
+        process.record(2, UNREACHABLE)
+        process.record(3, FAILED)
+        process.record_no_channel([4])
+        await process.close()
+        return process
+
+    process = asyncio.run(main())
+
+    # the failed guild is left to the next invocation
+    assert ledger.get_statuses() == {
+        1: STATUS_SENT,
+        2: STATUS_UNREACHABLE,
+        4: STATUS_NO_CHANNEL,
+    }
+    assert not process.claimed and not process.pending
+
+
+def test_a_failed_flush_is_retried(ledger):
+    ledger.fail_settles = 1
+
+    async def main():
+        process = BroadcastLedger(DATE, "a", claim_expires=None)
+        await process.claim(1)
+        process.record(1, SENT)
+        await process.flush()
+        statuses = ledger.get_statuses()
+        await process.close()
+        return statuses
+
+    assert asyncio.run(main()) == {1: STATUS_CLAIMED}
+    assert ledger.get_statuses() == {1: STATUS_SENT}
+
+
+class FakeLedgerTable:
+    def __init__(self, items):
+        self.items = items
+
+    def query(self, **kwargs):
+        return {"Items": self.items}
+
+
+def test_settled_guilds_include_live_claims_only(monkeypatch):
+    items = [
+        {"guild_id": 1, "status": STATUS_SENT, "claim_expires": 0},
+        {"guild_id": 2, "status": STATUS_NO_CHANNEL, "claim_expires": 0},
+        {"guild_id": 3, "status": STATUS_UNREACHABLE, "claim_expires": 0},
+        {"guild_id": 4, "status": STATUS_CLAIMED, "claim_expires": 200},
+        {"guild_id": 5, "status": STATUS_CLAIMED, "claim_expires": 50},
+    ]
+    monkeypatch.setattr(
+        broadcast_ledger, "broadcast_ledger_table", FakeLedgerTable(items)
+    )
+
+    settled = broadcast_ledger.get_settled_guild_ids_or_raise(DATE, unix_now=100)
+
+    assert settled == {1, 2, 3, 4}
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+import db.fx_rates as fx_rates
+import services.currency as currency
+from services.currency import PriceFormatter
+
+RATES = {"EUR": Decimal("0.92"), "BRL": Decimal("5.10")}
+
+
+def test_price_formatter_converts_from_usd():
+    assert PriceFormatter("EUR", RATES)(Decimal("3.00")) == "€2.76"
+    assert PriceFormatter("BRL", RATES)(Decimal("1000")) == "R$5,100.00"
+    assert PriceFormatter("EUR", RATES).change(Decimal("-1.00")) == "-€0.92"
+
+
+@pytest.mark.parametrize("code", ["GBP", "XYZ", None])
+def test_price_formatter_falls_back_to_usd(code):
+    # GBP is supported but has no rate here
+    assert PriceFormatter(code, RATES)(Decimal("3.5")) == "$3.50"
+
+
+class FakeFxRatesTable:
+    def __init__(self, as_of):
+        self.as_of = as_of
+
+    def get_item(self, Key):
+        return {"Item": {"as_of": self.as_of.isoformat(), "rates": RATES}}
+
+
+@pytest.fixture
+def store_rates(monkeypatch):
+    monkeypatch.setattr(currency, "fx_rates_cache", (0.0, {}))
+
+    def store_rates(days_old: int):
+        as_of = datetime.now(timezone.utc).date() - timedelta(days=days_old)
+        monkeypatch.setattr(fx_rates, "fx_rates_table", FakeFxRatesTable(as_of))
+
+    return store_rates
+
+
+def test_get_fx_rates_reads_recent_rates_once(store_rates, monkeypatch):
+    store_rates(days_old=fx_rates.MAX_FX_RATES_AGE_DAYS)
+
+    assert currency.get_fx_rates() == RATES
+    monkeypatch.setattr(fx_rates, "fx_rates_table", None)
+    assert currency.get_fx_rates() == RATES  # cached
+
+
+def test_get_fx_rates_ignores_stale_rates(store_rates):
+    store_rates(days_old=fx_rates.MAX_FX_RATES_AGE_DAYS + 1)
+
+    assert currency.get_fx_rates() == {}
+    assert PriceFormatter("EUR", currency.get_fx_rates())(Decimal(1)) == "$1.00"
@@ -0,0 +1,99 @@
+from urllib.parse import quote
+
+import pytest
+
+from services.item_index import ItemNameIndex, normalize
+import services.steam_api.validate as validate
+from services.steam_api.exceptions import UnknownItemNameError
+
+NAMES = [
+    "AK-47 | Redline (Field-Tested)",
+    "AK-47 | Redline (Minimal Wear)",
+    "AWP | Asiimov (Field-Tested)",
+    "StatTrak™ AWP | Asiimov (Field-Tested)",
+    "M4A4 | Howl (Factory New)",
+    "Sticker | Team Spirit | Copenhagen 2024",
+    "Sticker | Team Spirit | Shanghai 2024",
+]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = ItemNameIndex(NAMES)
+    monkeypatch.setattr(validate, "get_item_index", lambda: index)
+    return index
+
+
+def test_normalize_ignores_case_spacing_and_trademark():
+    assert normalize("  StatTrak™   AWP |  ASIIMOV ") == "stattrak awp | asiimov"
+
+
+def test_lookup_returns_the_canonical_name(index):
+    assert index.lookup("stattrak awp | asiimov (field-tested)") == NAMES[3]
+    assert index.lookup("AWP | Asiimov (Well-Worn)") is None
+
+
+def test_suggest_ranks_the_closest_names_first(index):
+    assert index.suggest("AK-47 | Redlin (Field-Tested)")[0] == NAMES[0]
+    assert index.suggest("Glock-18 | Fade") == []
+
+
+def test_complete_lists_prefix_matches_first(index):
+    assert index.complete("ak-47 | red") == NAMES[:2]
+    assert index.complete("awp", limit=1) == [NAMES[2]]
+
+
+def test_complete_finds_words_inside_names(index):
+    assert set(index.complete("asiimov")) == {NAMES[2], NAMES[3]}
+    # the typed text may stop in the middle of a word
+    assert set(index.complete("redl")) == set(NAMES[:2])
+
+
+def test_complete_requires_most_of_the_typed_trigrams(index):
+    assert index.complete("howl factory") == [NAMES[4]]
+    assert index.complete("xyzzy") == []
+
+
+def test_is_near_certain_typo():
+    assert validate.is_near_certain_typo("AK-47 | Redlin (Field-Tested)", NAMES[0])
+    assert not validate.is_near_certain_typo("AWP | Dragon Lore", NAMES[2])
+    # another year is likely a real item newer than the index
+    assert not validate.is_near_certain_typo(
+        "Sticker | Team Spirit | Copenhagen 2025", NAMES[5]
+    )
+
+
+def test_resolve_hash_name_locally(index):
+    resolve = validate.resolve_hash_name_locally_or_raise
+
+    assert resolve(quote("ak-47 | redline (field-tested)")) == quote(NAMES[0])
+    assert resolve(quote("AK-47 | Vulcan (Field-Tested)")) is None
+    with pytest.raises(UnknownItemNameError) as e:
+        resolve(quote("AK-47 | Redlnie (Field-Tested)"))
+    assert NAMES[0] in str(e.value)
+
+
+def test_resolve_hash_name_locally_without_an_index(monkeypatch):
+    monkeypatch.setattr(validate, "get_item_index", lambda: ItemNameIndex([]))
+
+    assert validate.resolve_hash_name_locally_or_raise(quote(NAMES[0])) is None
+
+
+@pytest.mark.parametrize(
+    "command_argument",
+    [
+        "ak-47 | redline (FT)",
+        "AK-47 | Redline (Field-Tested)",
+        "https://steamcommunity.com/market/listings/730/AK-47%20%7C%20Redline%20%28Field-Tested%29",
+    ],
+)
+def test_stored_hash_name_matches_what_add_skin_stores(index, command_argument):
+    stored = validate.get_stored_hash_name_or_raise(command_argument)
+
+    assert stored == quote(NAMES[0])
+
+
+def test_stored_hash_name_of_an_unknown_item_is_left_as_typed(index):
+    stored = validate.get_stored_hash_name_or_raise("StatTrak Glock-18 | Fade (FN)")
+
+    assert stored == quote("StatTrak™ Glock-18 | Fade (Factory New)")
@@ -0,0 +1,37 @@
+from decimal import Decimal
+import time
+
+from config import MAX_PRICE_AGE_SECONDS
+from services.portfolio import value_portfolio
+
+
+def test_value_portfolio_totals_and_daily_change():
+    now = int(time.time())
+    latest_prices = {
+        "AK": {
+            "last_price": Decimal("10.00"),
+            "prev_day_price": Decimal("8.00"),
+            "last_refresh": now,
+        },
+        "M4": {"last_price": Decimal("3.00"), "last_refresh": now},
+    }
+
+    valuation = value_portfolio({"M4": 5, "AK": 2}, latest_prices)
+
+    assert valuation.total_usd == Decimal("35.00")
+    assert valuation.daily_change_usd == Decimal("4.00")
+    # only skins priced on both days count towards yesterday's value
+    assert valuation.previous_total_usd == Decimal("16.00")
+    assert [line.hash_name for line in valuation.lines] == ["AK", "M4"]
+    assert valuation.lines[1].daily_change_usd is None
+
+
+def test_value_portfolio_leaves_stale_and_missing_prices_out():
+    stale = int(time.time()) - MAX_PRICE_AGE_SECONDS - 60
+    latest_prices = {"AK": {"last_price": Decimal("10.00"), "last_refresh": stale}}
+
+    valuation = value_portfolio({"AK": 1, "M4": 1}, latest_prices)
+
+    assert valuation.total_usd == 0
+    assert valuation.n_unpriced == 2
+    assert all(line.value_usd is None for line in valuation.lines)
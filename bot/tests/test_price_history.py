@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+import db.skins_prices as skins_prices
+from models.rollups import pack_points
+from utils.render_messages import (
+    SPARKLINE_BARS,
+    render_price_history_embed,
+    render_sparkline,
+)
+
+
+class FakeTable:
+    """
+    Answers each query with the next list of pages, one page per call; the key
+    conditions are not evaluated.
+    """
+
+    def __init__(self, queries):
+        self.pages = [
+            (page, i + 1 < len(pages))
+            for pages in queries
+            for i, page in enumerate(pages)
+        ]
+        self.queries = []
+
+    def query(self, **kwargs):
+        self.queries.append(kwargs)
+        page, has_more = self.pages.pop(0) if self.pages else ([], False)
+        response = {"Items": page}
+        if has_more:
+            response["LastEvaluatedKey"] = {"n": len(self.queries)}
+        return response
+
+
+def test_get_price_history_merges_rollups_and_raw_points(monkeypatch):
+    since = 1_000_000
+    week = {"period": "week#x"} | pack_points(
+        {since - 10: Decimal("0.50"), since + 10: Decimal("1.00")}, since - 100
+    )
+    day = {"period": "day#x"} | pack_points({since + 20: Decimal("2.00")}, since)
+    # day records over two pages, then week records
+    rollups = FakeTable([[[], [day]], [[week]]])
+    raw = FakeTable(
+        [
+            [
+                [{"unix_timestamp": Decimal(since + 30), "price_usd": Decimal("3.00")}],
+                [{"unix_timestamp": Decimal(since + 20), "price_usd": Decimal("2.50")}],
+            ]
+        ]
+    )
+    monkeypatch.setattr(skins_prices, "skin_price_rollups_table", rollups)
+    monkeypatch.setattr(skins_prices, "skin_prices_table", raw)
+
+    history = skins_prices.get_price_history_or_raise("AK", since)
+
+    assert history == [
+        (since + 10, Decimal("1.00")),
+        (since + 20, Decimal("2.50")),  # raw points win over the rollups
+        (since + 30, Decimal("3.00")),
+    ]
+    assert len(rollups.queries) == 3
+    assert rollups.queries[1]["ExclusiveStartKey"] == {"n": 1}
+    assert raw.queries[1]["ExclusiveStartKey"] == {"n": 1}
+
+
+def test_render_sparkline_scales_between_min_and_max():
+    assert render_sparkline([1, 2, 3]) == (
+        SPARKLINE_BARS[0] + SPARKLINE_BARS[4] + SPARKLINE_BARS[-1]
+    )
+    assert render_sparkline([5, 5]) == SPARKLINE_BARS[0] * 2
+
+
+def test_render_price_history_embed_without_points():
+    embed = render_price_history_embed("AK-47%20%7C%20Redline%20(Field-Tested)", [], 30)
+
+    assert "AK-47 | Redline (FT)" in embed.description
+    assert "30 day(s)" in embed.description
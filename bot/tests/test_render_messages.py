@@ -0,0 +1,82 @@
+from decimal import Decimal
+
+import discord
+
+from models.skin_names import skin_names
+from utils.render_messages import (
+    MAX_EMBEDS_PER_MESSAGE,
+    MESSAGE_EMBEDS_LIMIT,
+    SKIN_PRICES_TITLE,
+    SkinPricesRenderer,
+    group_embeds,
+    split_lines,
+)
+
+
+def test_split_lines_fills_each_description_up_to_the_limit():
+    lines = ["aaaa\n", "bbbb\n", "cccc\n"]
+
+    assert split_lines(lines, limit=10) == ["aaaa\nbbbb\n", "cccc\n"]
+    assert split_lines(lines, limit=15) == ["aaaa\nbbbb\ncccc\n"]
+
+
+def test_split_lines_never_splits_a_line():
+    assert split_lines(["a" * 20, "b"], limit=10) == ["a" * 20, "b"]
+
+
+def test_split_lines_without_lines_gives_one_empty_description():
+    assert split_lines([]) == [""]
+
+
+def test_group_embeds_caps_the_embeds_per_message():
+    embeds = [discord.Embed(description="x") for _ in range(MAX_EMBEDS_PER_MESSAGE + 1)]
+
+    messages = group_embeds(embeds)
+
+    assert [len(message) for message in messages] == [MAX_EMBEDS_PER_MESSAGE, 1]
+    assert [embed for message in messages for embed in message] == embeds
+
+
+def test_group_embeds_caps_the_characters_per_message():
+    size = MESSAGE_EMBEDS_LIMIT // 2 - 10
+    embeds = [discord.Embed(description="x" * size) for _ in range(3)]
+
+    assert [len(message) for message in group_embeds(embeds)] == [2, 1]
+
+
+def test_group_embeds_sends_an_oversized_embed_alone():
+    big = discord.Embed(description="x" * MESSAGE_EMBEDS_LIMIT)
+    small = discord.Embed(description="x")
+
+    assert group_embeds([small, big, small]) == [[small], [big], [small]]
+    assert group_embeds([]) == []
+
+
+def test_skin_prices_renderer_sorts_by_price_and_titles_the_first_embed():
+    cheap = skin_names.intern("Cheap%20Skin")
+    dear = skin_names.intern("Dear%20Skin")
+    unpriced = skin_names.intern("Unpriced%20Skin")
+    skin_prices = tuple(
+        sorted([(cheap, Decimal("1.00")), (dear, Decimal("9.00")), (unpriced, None)])
+    )
+
+    embeds = SkinPricesRenderer().render_skins(skin_prices)
+
+    assert len(embeds) == 1
+    assert embeds[0].title == SKIN_PRICES_TITLE
+    description = embeds[0].description
+    assert (
+        description.index("Dear Skin")
+        < description.index("Cheap Skin")
+        < description.index("Unpriced Skin")
+    )
+
+
+def test_skin_prices_renderer_reuses_the_embeds_of_identical_guilds():
+    skin_id = skin_names.intern("Shared%20Skin")
+    renderer = SkinPricesRenderer()
+
+    first = renderer.render_skins(((skin_id, Decimal("2.00")),))
+
+    assert renderer.render_skins(((skin_id, Decimal("2.00")),)) is first
+    assert renderer.render_skins(((skin_id, Decimal("2.50")),)) is not first
@@ -0,0 +1,187 @@
+import asyncio
+
+import discord
+import pytest
+
+import services.send_queue as send_queue
+from services.send_queue import FAILED, SENT, UNREACHABLE, SendQueue
+
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "fake"
+
+
+class FakeChannel:
+    """
+    Records the sent messages; `errors` are raised by the next sends, in order.
+    """
+
+    def __init__(self, errors=(), delay: float = 0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.sent = []
+
+    async def send(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(kwargs["content"])
+
+
+class FakeBot:
+    def __init__(self, channels: dict):
+        self.channels = channels
+        self.fetched = []
+
+    def get_channel(self, channel_id):
+        return None if channel_id in self.fetched else self.channels.get(channel_id)
+
+    async def fetch_channel(self, channel_id):
+        self.fetched.append(channel_id)
+        if channel_id not in self.channels:
+            raise discord.NotFound(FakeResponse(404), "Unknown Channel")
+        return self.channels[channel_id]
+
+
+def messages(*contents):
+    return [{"content": content} for content in contents]
+
+
+async def send_units(bot, units):
+    outcomes = {}
+    async with SendQueue(bot) as queue:
+        for channel_id, contents in units:
+            await queue.put_all(
+                channel_id,
+                messages(*contents),
+                on_done=lambda outcome, c=channel_id: outcomes.setdefault(c, outcome),
+            )
+    return outcomes, queue
+
+
+def test_units_are_sent_in_order():
+    channel = FakeChannel()
+
+    outcomes, queue = asyncio.run(send_units(FakeBot({1: channel}), [(1, "abc")]))
+
+    assert outcomes == {1: SENT}
+    assert channel.sent == ["a", "b", "c"]
+    assert queue.n_sent == 3
+
+
+def test_missing_channels_are_unreachable_for_the_rest_of_the_broadcast():
+    bot = FakeBot({})
+
+    async def main():
+        outcomes = []
+        async with SendQueue(bot) as queue:
+            for _ in range(2):
+                await queue.put_all(1, messages("a"), on_done=outcomes.append)
+        return outcomes
+
+    assert asyncio.run(main()) == [UNREACHABLE, UNREACHABLE]
+    assert bot.fetched == [1]  # the second unit doesn't try again
+
+
+def test_forbidden_stops_the_unit():
+    channel = FakeChannel([discord.Forbidden(FakeResponse(403), "Missing Access")])
+
+    outcomes, _ = asyncio.run(send_units(FakeBot({1: channel}), [(1, "ab")]))
+
+    assert outcomes == {1: UNREACHABLE}
+    assert channel.sent == []
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    sleep = asyncio.sleep
+    delays = []
+
+    async def fast_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", fast_sleep)
+    return delays
+
+
+def test_server_errors_are_retried_with_backoff(backoffs):
+    errors = [discord.HTTPException(FakeResponse(503), "unavailable")] * 2
+    channel = FakeChannel(errors)
+
+    outcomes, _ = asyncio.run(send_units(FakeBot({1: channel}), [(1, "a")]))
+
+    assert outcomes == {1: SENT}
+    assert channel.sent == ["a"]
+    assert [delay for delay in backoffs if delay] == [2, 4]
+
+
+def test_server_errors_fail_the_unit_after_max_attempts(backoffs):
+    errors = [discord.HTTPException(FakeResponse(500), "error")] * 10
+    channel = FakeChannel(errors)
+
+    outcomes, queue = asyncio.run(send_units(FakeBot({1: channel}), [(1, "ab")]))
+
+    assert outcomes == {1: FAILED}
+    assert len(channel.errors) == 10 - send_queue.MAX_ATTEMPTS
+    assert queue.n_failed == 1
+
+
+@pytest.mark.parametrize("status", [400, 429])
+def test_client_errors_and_rate_limits_are_not_retried(backoffs, status):
+    channel = FakeChannel([discord.HTTPException(FakeResponse(status), "error")])
+
+    outcomes, _ = asyncio.run(send_units(FakeBot({1: channel}), [(1, "ab")]))
+
+    assert outcomes == {1: FAILED}
+    assert channel.sent == []
+    assert not any(backoffs)
+
+
+def test_a_failing_channel_doesnt_stop_the_others():
+    bot = FakeBot({1: FakeChannel([RuntimeError("boom")]), 2: FakeChannel()})
+
+    outcomes, _ = asyncio.run(send_units(bot, [(1, "a"), (2, "b")]))
+
+    assert outcomes == {1: FAILED, 2: SENT}
+
+
+def test_abort_finishes_started_units_and_drops_queued_ones(monkeypatch):
+    monkeypatch.setattr(send_queue, "MAX_CONCURRENT_SENDS", 1)
+    channel = FakeChannel(delay=0.01)
+    outcomes = []
+
+    async def main():
+        async with SendQueue(FakeBot({1: channel})) as queue:
+            await queue.put_all(1, messages("a", "b"), on_done=outcomes.append)
+            await queue.put_all(1, messages("c"), on_done=outcomes.append)
+            await asyncio.sleep(0.005)  # the first unit is being sent
+            raise RuntimeError("broadcast failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+    assert channel.sent == ["a", "b"]
+    assert outcomes == [SENT]
+
+
+def test_abort_gives_up_on_units_stuck_past_the_timeout(monkeypatch):
+    monkeypatch.setattr(send_queue, "ABORT_TIMEOUT_SECONDS", 0.05)
+    channel = FakeChannel(delay=60)
+    outcomes = []
+
+    async def main():
+        async with SendQueue(FakeBot({1: channel})) as queue:
+            await queue.put_all(1, messages("a"), on_done=outcomes.append)
+            await asyncio.sleep(0)
+            raise RuntimeError("broadcast failed")
+
+    async def timed():
+        started = asyncio.get_running_loop().time()
+        with pytest.raises(RuntimeError):
+            await main()
+        return asyncio.get_running_loop().time() - started
+
+    assert asyncio.run(timed()) < 1
+    assert outcomes == []
@@ -0,0 +1,57 @@
+from botocore.exceptions import ClientError
+import pytest
+
+import db.shard_leases as shard_leases
+
+
+def conditional_check_failed():
+    return ClientError(
+        {"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"
+    )
+
+
+class FakeLeasesTable:
+    def __init__(self, held=()):
+        self.held = set(held)  # shard keys leased by another process
+        self.leases = {}
+
+    def put_item(self, Item, **kwargs):
+        if Item["shard_key"] in self.held:
+            raise conditional_check_failed()
+        self.leases[Item["shard_key"]] = Item["owner"]
+
+    def delete_item(self, Key, **kwargs):
+        if Key["shard_key"] not in self.leases:
+            raise conditional_check_failed()
+        del self.leases[Key["shard_key"]]
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeLeasesTable()
+    monkeypatch.setattr(shard_leases, "shard_leases_table", table)
+    return table
+
+
+def test_acquire_leases_takes_every_shard(table):
+    result = shard_leases.acquire_leases([0, 1], 4, "me", 100, 200)
+
+    assert result.success
+    assert table.leases == {"0/4": "me", "1/4": "me"}
+
+
+def test_acquire_leases_gives_back_the_shards_taken_before_a_held_one(table):
+    table.held.add("1/4")
+
+    result = shard_leases.acquire_leases([0, 1, 2], 4, "me", 100, 200)
+
+    assert not result.success
+    assert "1/4" in result.text
+    assert table.leases == {}
+
+
+def test_release_leases_ignores_leases_taken_over(table):
+    table.leases["0/4"] = "me"
+
+    assert shard_leases.release_leases([0, 1], 4, "me").success
+    assert table.leases == {}
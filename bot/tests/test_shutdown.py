@@ -0,0 +1,89 @@
+import asyncio
+import inspect
+
+from services.shutdown import ShutdownCoordinator
+
+
+def test_tracked_commands_are_in_flight_until_they_return():
+    coordinator = ShutdownCoordinator()
+    seen_in_flight = []
+
+    @coordinator.tracked
+    async def command(interaction, skin: str):
+        seen_in_flight.append(asyncio.current_task() in coordinator.in_flight)
+        return skin
+
+    async def main():
+        return await asyncio.create_task(command(None, skin="AK"))
+
+    assert asyncio.run(main()) == "AK"
+    assert seen_in_flight == [True]
+    assert not coordinator.in_flight
+    # discord.py reads the slash command options from the signature
+    assert list(inspect.signature(command).parameters) == ["interaction", "skin"]
+
+
+def test_drain_waits_for_work_run_from_a_never_ending_loop():
+    coordinator = ShutdownCoordinator()
+    finished = []
+
+    async def broadcast():
+        await asyncio.sleep(0.01)
+        finished.append(True)
+
+    async def loop():
+        while True:
+            await coordinator.run(broadcast())
+            await asyncio.sleep(3600)
+
+    async def main():
+        loop_task = asyncio.create_task(loop())
+        await asyncio.sleep(0)
+        coordinator.stop_accepting()
+        started = asyncio.get_running_loop().time()
+        await coordinator.drain(timeout=5)
+        elapsed = asyncio.get_running_loop().time() - started
+        loop_task.cancel()
+        return elapsed
+
+    assert asyncio.run(main()) < 1
+    assert finished == [True]
+    assert not coordinator.in_flight
+
+
+def test_drain_cancels_what_is_left_after_the_timeout():
+    coordinator = ShutdownCoordinator()
+    checkpointed = []
+
+    async def broadcast():
+        try:
+            await asyncio.sleep(3600)
+        finally:
+            checkpointed.append(True)
+
+    async def loop():
+        await coordinator.run(broadcast())
+        return "loop carried on"
+
+    async def main():
+        loop_task = asyncio.create_task(loop())
+        await asyncio.sleep(0)
+        await coordinator.drain(timeout=0.01)
+        return await loop_task
+
+    # cancelling the work doesn't cancel the task that awaited it
+    assert asyncio.run(main()) == "loop carried on"
+    assert checkpointed == [True]
+
+
+def test_cancelling_the_caller_of_run_still_cancels_it():
+    coordinator = ShutdownCoordinator()
+
+    async def main():
+        caller = asyncio.create_task(coordinator.run(asyncio.sleep(3600)))
+        await asyncio.sleep(0)
+        caller.cancel()
+        await asyncio.wait([caller])
+        return caller.cancelled()
+
+    assert asyncio.run(main())
@@ -0,0 +1,108 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import db.tracked_skins as tracked_skins
+from models.skin_names import SkinNameTable, abbreviate_wear, skin_names
+from models.tracking_index import TrackingIndex
+import services.broadcast as broadcast
+
+REDLINE = "AK-47%20%7C%20Redline%20%28Field-Tested%29"
+
+
+def test_intern_gives_dense_stable_ids():
+    names = SkinNameTable()
+
+    assert [names.intern(n) for n in ("a", "b", "a", "c")] == [0, 1, 0, 2]
+    assert len(names) == 3
+    assert names.get_id("b") == 1
+    assert names.get_id("unknown") is None
+    assert names.get_hash_name(2) == "c"
+
+
+def test_names_are_decoded_once_on_first_use():
+    names = SkinNameTable()
+    skin_id = names.intern(REDLINE)
+
+    assert names.plain_names[skin_id] is None
+    assert names.get_display_name(skin_id) == "AK-47 | Redline (FT)"
+    assert names.get_plain_name(skin_id) == "AK-47 | Redline (Field-Tested)"
+    assert names.get_plain_name(skin_id) is names.plain_names[skin_id]
+
+
+def test_abbreviate_wear():
+    assert abbreviate_wear("AWP | Asiimov (Battle-Scarred)") == "AWP | Asiimov (BS)"
+    assert abbreviate_wear("Sticker | Crown (Foil)") == "Sticker | Crown (Foil)"
+
+
+def test_concurrent_interns_agree_on_the_ids():
+    names = SkinNameTable()
+    hash_names = [f"skin{i}" for i in range(500)]
+
+    def intern_all(order):
+        return {hn: names.intern(hn) for hn in order}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(intern_all, [hash_names, hash_names[::-1]] * 4))
+
+    assert all(result == results[0] for result in results)
+    assert sorted(results[0].values()) == list(range(len(hash_names)))
+
+
+def test_cached_tracked_skin_ids(monkeypatch):
+    reads = []
+
+    def get_tracked_hash_names_or_raise(guild_id):
+        reads.append(guild_id)
+        return [REDLINE]
+
+    monkeypatch.setattr(tracked_skins, "tracked_hash_names_cache", {})
+    monkeypatch.setattr(
+        tracked_skins,
+        "get_tracked_hash_names_or_raise",
+        get_tracked_hash_names_or_raise,
+    )
+
+    async def main():
+        first = await tracked_skins.get_cached_tracked_skin_ids(1)
+        second = await tracked_skins.get_cached_tracked_skin_ids(1)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert list(first) == [skin_names.get_id(REDLINE)]
+    assert second is first
+    assert reads == [1]
+
+
+def test_cached_tracked_skin_ids_are_empty_when_the_read_fails(monkeypatch):
+    def get_tracked_hash_names_or_raise(guild_id):
+        raise RuntimeError("throttled")
+
+    monkeypatch.setattr(tracked_skins, "tracked_hash_names_cache", {})
+    monkeypatch.setattr(
+        tracked_skins,
+        "get_tracked_hash_names_or_raise",
+        get_tracked_hash_names_or_raise,
+    )
+
+    assert len(asyncio.run(tracked_skins.get_cached_tracked_skin_ids(1))) == 0
+    assert tracked_skins.tracked_hash_names_cache == {}
+
+
+def test_plan_price_column_is_sized_by_the_planned_skins(monkeypatch):
+    skin_id = skin_names.intern("Sized%20Skin")
+    for i in range(10):
+        skin_names.intern(f"Unplanned%20Skin%20{i}")
+    index = TrackingIndex()
+    index.add(1, "Sized%20Skin")
+    monkeypatch.setattr(
+        broadcast, "get_all_guild_info_or_raise", lambda: {1: {"channel_id": 10}}
+    )
+    monkeypatch.setattr(broadcast, "get_tracking_index_or_raise", lambda: index)
+    monkeypatch.setattr(broadcast, "get_latest_prices_or_raise", lambda names: {})
+
+    plan = broadcast.plan_broadcast_or_raise({1})
+
+    assert len(plan.price_cents) == skin_id + 1
+    assert plan.get_price_usd(skin_id) is None
+    assert plan.get_price_usd(skin_id + 5) is None
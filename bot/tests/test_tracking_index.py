@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+import db.tracked_skins as tracked_skins
+import services.broadcast as broadcast
+from models.skin_names import SkinNameTable, skin_names
+from models.tracking_index import TrackingIndex
+
+
+def test_tracking_index_add_contains_remove():
+    index = TrackingIndex(SkinNameTable())
+    index.add(1, "AK")
+    index.add(1, "M4")
+    index.add(2, "AK")
+
+    assert len(index) == 3
+    assert index.contains(1, "M4")
+    assert not index.contains(2, "M4")
+    assert not index.contains(3, "Unknown")
+
+    index.remove(1, "M4")
+    index.remove(1, "M4")  # no-op
+    index.remove(2, "AK")
+    assert len(index) == 1
+    assert list(index.get_skin_ids(1)) == [index.names.get_id("AK")]
+    assert 2 not in index.skin_ids_by_guild
+
+
+class FakeTrackedSkinsTable:
+    def __init__(self, pages=()):
+        self.pages = list(pages)
+        self.n_scans = 0
+        self.items = set()
+
+    def scan(self, **kwargs):
+        self.n_scans += 1
+        response = {"Items": self.pages.pop(0)}
+        if self.pages:
+            response["LastEvaluatedKey"] = {"n": self.n_scans}
+        return response
+
+    def put_item(self, Item):
+        self.items.add((Item["guild_id"], Item["hash_name"]))
+
+    def delete_item(self, Key, **kwargs):
+        self.items.discard((Key["guild_id"], Key["hash_name"]))
+
+
+@pytest.fixture
+def table(monkeypatch):
+    table = FakeTrackedSkinsTable(
+        [
+            [{"guild_id": Decimal(1), "hash_name": "AK"}],
+            [{"guild_id": Decimal(2), "hash_name": "AK"}],
+        ]
+    )
+    monkeypatch.setattr(tracked_skins, "tracked_skins_table", table)
+    monkeypatch.setattr(tracked_skins, "tracking_index", None)
+    monkeypatch.setattr(tracked_skins, "get_tracked_hash_names_or_raise", lambda g: [])
+    monkeypatch.setattr(tracked_skins, "get_max_tracked_skins_or_raise", lambda g: 10)
+    return table
+
+
+def test_tracking_index_is_loaded_once_over_every_page(table):
+    index = tracked_skins.get_tracking_index_or_raise()
+
+    assert tracked_skins.get_tracking_index_or_raise() is index
+    assert table.n_scans == 2
+    assert index.contains(1, "AK") and index.contains(2, "AK")
+
+
+def test_track_and_untrack_keep_the_loaded_index_up_to_date(table):
+    index = tracked_skins.get_tracking_index_or_raise()
+
+    tracked_skins.track_hash_name_or_raise(1, "M4")
+    tracked_skins.untrack_hash_name_or_raise(2, "AK")
+
+    assert index.contains(1, "M4")
+    assert not index.contains(2, "AK")
+    assert len(index) == 2
+
+
+def test_track_before_the_first_load_leaves_the_index_to_the_load(table):
+    tracked_skins.track_hash_name_or_raise(3, "M4")
+
+    assert tracked_skins.tracking_index is None
+
+
+def test_plan_broadcast(monkeypatch):
+    now = int(datetime.now(timezone.utc).timestamp())
+    index = TrackingIndex()
+    index.add(1, "Plan%20AK")
+    index.add(1, "Plan%20M4")
+    index.add(2, "Plan%20AK")
+    guild_infos = {
+        1: {"channel_id": Decimal(10), "currency": "EUR"},
+        2: {"channel_id": Decimal(20)},
+        3: {},
+    }
+    latest_prices = {
+        "Plan%20AK": {"last_price": Decimal("3.47"), "last_refresh": now},
+        "Plan%20M4": {"last_price": Decimal("9.00"), "last_refresh": now - 2 * 86400},
+    }
+    monkeypatch.setattr(broadcast, "get_all_guild_info_or_raise", lambda: guild_infos)
+    monkeypatch.setattr(broadcast, "get_tracking_index_or_raise", lambda: index)
+    monkeypatch.setattr(
+        broadcast, "get_latest_prices_or_raise", lambda hash_names: latest_prices
+    )
+
+    plan = broadcast.plan_broadcast_or_raise({1, 2, 3, 4})
+
+    assert sorted(plan.no_channel_guild_ids) == [3, 4]
+    guilds = {guild.guild_id: guild for guild in plan.guilds}
+    assert guilds[1].channel_id == 10 and guilds[1].currency == "EUR"
+    ak, m4 = skin_names.get_id("Plan%20AK"), skin_names.get_id("Plan%20M4")
+    assert dict(plan.get_skin_prices(guilds[1])) == {
+        ak: Decimal("3.47"),
+        m4: None,  # too old to be shown
+    }
+    assert plan.get_skin_prices(guilds[2]) == ((ak, Decimal("3.47")),)
+
+
+def test_plan_broadcast_without_channels_skips_the_other_reads(monkeypatch):
+    monkeypatch.setattr(broadcast, "get_all_guild_info_or_raise", lambda: {})
+    monkeypatch.setattr(broadcast, "get_tracking_index_or_raise", None)
+
+    plan = broadcast.plan_broadcast_or_raise({1})
+
+    assert plan.guilds == [] and plan.no_channel_guild_ids == [1]
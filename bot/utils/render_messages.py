@@ -1,6 +1,11 @@
+from datetime import datetime, timezone
 from urllib.parse import unquote
+
 import discord
 
+from models.skin_names import abbreviate_wear, get_display_name, skin_names
+from services.currency import PriceFormatter
+
 
 def render_no_active_listings_msg(COMMAND_PREFIX):
     return (
@@ -11,6 +16,10 @@ def render_no_active_listings_msg(COMMAND_PREFIX):
     )
 
 
+def render_restarting_msg():
+    return ":hourglass: SkinsBot is restarting, try again in a minute."
+
+
 def render_help_embed(COMMAND_PREFIX: str) -> dict:
     embed_dict = {
         "title": "SkinsBot — Commands",
@@ -39,6 +48,26 @@ def render_help_embed(COMMAND_PREFIX: str) -> dict:
                 "value": "Show all skins currently being tracked in this server/channel.",
                 "inline": False,
             },
+            {
+                "name": f"{COMMAND_PREFIX}set_currency <currency code>",
+                "value": "Show prices in another currency (e.g. EUR, BRL). Default: USD.",
+                "inline": False,
+            },
+            {
+                "name": f"{COMMAND_PREFIX}set_holding <quantity> <skin name>",
+                "value": "Set how many of a skin the server holds (0 removes it).",
+                "inline": False,
+            },
+            {
+                "name": f"{COMMAND_PREFIX}portfolio",
+                "value": "Show the value of the server's holdings and today's change.",
+                "inline": False,
+            },
+            {
+                "name": f"{COMMAND_PREFIX}price_history <skin name>",
+                "value": "Show a skin's price over the last 30 days.",
+                "inline": False,
+            },
             {
                 "name": f"{COMMAND_PREFIX}formatting_help",
                 "value": "Examples and rules for formatting skin names (recommended input method).",
@@ -102,36 +131,228 @@ def render_formatting_help_msg(COMMAND_PREFIX):
     )
 
 
-def abbreviate_wear(unquoted_hash_name: str) -> str:
-    abbreviations = {
-        "Factory New": "FN",
-        "Minimal Wear": "MW",
-        "Field-Tested": "FT",
-        "Well-Worn": "WW",
-        "Battle-Scarred": "BS",
-    }
-    for full, abbr in abbreviations.items():
-        if f"({full})" in unquoted_hash_name:
-            return unquoted_hash_name.replace(f"({full})", f"({abbr})")
-    return unquoted_hash_name
-
-
-def render_skin_prices_message(hash_name_to_price_usd_map: dict):
-    title = ":gem: CS2 Price Tracker :gem:"
-    description = ""
-    sorted_map = {
-        k: v
-        for k, v in sorted(
-            hash_name_to_price_usd_map.items(), key=lambda item: item[1], reverse=True
+SKIN_PRICES_TITLE = ":gem: CS2 Price Tracker :gem:"
+SKIN_PRICES_COLOR = 0x68B2FC
+PORTFOLIO_TITLE = ":moneybag: Portfolio :moneybag:"
+PRICE_HISTORY_TITLE = ":chart_with_upwards_trend: Price History"
+SPARKLINE_BARS = "▁▂▃▄▅▆▇█"
+EMBED_DESCRIPTION_LIMIT = 4096  # Discord's limit on embed descriptions
+# Discord's limits on the embeds of one message
+MAX_EMBEDS_PER_MESSAGE = 10
+MESSAGE_EMBEDS_LIMIT = 6000
+
+
+def render_skin_price_line(hash_name: str, price_usd, format_price) -> str:
+    display_name = get_display_name(hash_name)
+    if price_usd is None:
+        return f":small_orange_diamond: **{display_name}** — no recent price\n"
+    return f":small_blue_diamond: **{display_name}** — **{format_price(price_usd)}**\n"
+
+
+def split_lines(lines: list[str], limit: int = EMBED_DESCRIPTION_LIMIT) -> list[str]:
+    # Groups lines into as few descriptions of at most `limit` chars as possible
+    descriptions = []
+    chunk = []
+    chunk_len = 0
+    for line in lines:
+        if chunk and chunk_len + len(line) > limit:
+            descriptions.append("".join(chunk))
+            chunk = []
+            chunk_len = 0
+        chunk.append(line)
+        chunk_len += len(line)
+    if chunk or not descriptions:
+        descriptions.append("".join(chunk))
+    return descriptions
+
+
+def group_embeds(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+    # Packs embeds, in order, into as few messages as Discord's limits allow
+    messages = []
+    message = []
+    message_len = 0
+    for embed in embeds:
+        if message and (
+            len(message) == MAX_EMBEDS_PER_MESSAGE
+            or message_len + len(embed) > MESSAGE_EMBEDS_LIMIT
+        ):
+            messages.append(message)
+            message = []
+            message_len = 0
+        message.append(embed)
+        message_len += len(embed)
+    if message:
+        messages.append(message)
+    return messages
+
+
+class SkinPricesRenderer:
+    """
+    Renders price update embeds for one broadcast.
+
+    Skins are referred to by their ids in models.skin_names.skin_names.
+    Formatted lines are memoized per (skin id, price, currency) and whole embed
+    lists per (skin prices, currency), so guilds tracking the same skins share
+    the same rendering work. Create a new renderer for each broadcast so prices
+    and exchange rates never go stale.
+    """
+
+    def __init__(self, fx_rates: dict | None = None):
+        self.fx_rates = fx_rates or {}
+        self.formatters = {}
+        self.lines = {}
+        self.embeds = {}
+
+    def get_formatter(self, currency: str | None) -> PriceFormatter:
+        if currency not in self.formatters:
+            self.formatters[currency] = PriceFormatter(currency, self.fx_rates)
+        return self.formatters[currency]
+
+    def render_line(self, skin_id: int, price_usd, currency: str | None) -> str:
+        key = (skin_id, price_usd, currency)
+        if key not in self.lines:
+            self.lines[key] = render_skin_price_line(
+                skin_names.get_hash_name(skin_id),
+                price_usd,
+                self.get_formatter(currency),
+            )
+        return self.lines[key]
+
+    def render_skins(
+        self, skin_prices: tuple[tuple[int, object], ...], currency: str | None = None
+    ) -> list[discord.Embed]:
+        """
+        `skin_prices` is a tuple of (skin id, price_usd or None) sorted by skin id
+        (see services.broadcast.BroadcastPlan.get_skin_prices).
+        """
+        key = (skin_prices, currency)
+        if key in self.embeds:
+            return self.embeds[key]
+
+        # most expensive first, skins without a recent price last
+        sorted_items = sorted(
+            skin_prices,
+            key=lambda item: (
+                item[1] is None,
+                -float(item[1] or 0),
+                skin_names.get_hash_name(item[0]),
+            ),
         )
-    }
-    for hash_name, price_usd in sorted_map.items():
-        price = round(float(price_usd), 2)
-        unquoted_hash_name = abbreviate_wear(unquote(hash_name))
+        lines = [self.render_line(i, price, currency) for i, price in sorted_items]
+        descriptions = split_lines(lines)
+        embeds = [
+            discord.Embed(
+                title=SKIN_PRICES_TITLE if i == 0 else None,
+                description=description,
+                color=SKIN_PRICES_COLOR,
+            )
+            for i, description in enumerate(descriptions)
+        ]
+        self.embeds[key] = embeds
+        return embeds
+
+
+def render_portfolio_line(line, format_price: PriceFormatter) -> str:
+    name = get_display_name(line.hash_name)
+    if line.value_usd is None:
+        return f":small_orange_diamond: {line.quantity}x **{name}** — no recent price\n"
+    text = (
+        f":small_blue_diamond: {line.quantity}x **{name}** — "
+        f"**{format_price(line.value_usd)}** ({format_price(line.price_usd)} each"
+    )
+    if line.daily_change_usd is not None:
+        text += f", {format_price.change(line.daily_change_usd)} today"
+    return text + ")\n"
+
+
+def render_portfolio_embeds(
+    valuation,
+    COMMAND_PREFIX: str,
+    currency: str | None = None,
+    fx_rates: dict | None = None,
+) -> list[discord.Embed]:
+    """
+    `valuation` is a services.portfolio.PortfolioValuation.
+    """
+    format_price = PriceFormatter(currency, fx_rates or {})
+    if not valuation.lines:
+        description = (
+            "This server's portfolio is empty. "
+            f"Use `{COMMAND_PREFIX}set_holding <quantity> <skin name>`"
+        )
+        return [discord.Embed(title=PORTFOLIO_TITLE, description=description)]
+
+    summary = f"**Total: {format_price(valuation.total_usd)}**"
+    if valuation.previous_total_usd:
+        change = valuation.daily_change_usd
+        percent = 100 * change / valuation.previous_total_usd
+        summary += f" ({format_price.change(change)}, {percent:+.2f}% today)"
+    if valuation.n_unpriced:
+        summary += f"\n{valuation.n_unpriced} skin(s) without a recent price"
+
+    lines = [summary + "\n\n"] + [
+        render_portfolio_line(line, format_price) for line in valuation.lines
+    ]
+    return [
+        discord.Embed(
+            title=PORTFOLIO_TITLE if i == 0 else None,
+            description=description,
+            color=SKIN_PRICES_COLOR,
+        )
+        for i, description in enumerate(split_lines(lines))
+    ]
+
+
+def render_sparkline(prices: list) -> str:
+    low, high = min(prices), max(prices)
+    if low == high:
+        return SPARKLINE_BARS[0] * len(prices)
+    top = len(SPARKLINE_BARS) - 1
+    return "".join(
+        SPARKLINE_BARS[round(top * (price - low) / (high - low))] for price in prices
+    )
+
+
+def render_price_history_embed(
+    hash_name: str,
+    history: list[tuple[int, object]],
+    days: int,
+    currency: str | None = None,
+    fx_rates: dict | None = None,
+) -> discord.Embed:
+    """
+    `history` is the output of db.skins_prices.get_price_history_or_raise: the
+    (unix_timestamp, price_usd) points since `days` ago, oldest first.
+    """
+    # the name is typed by the user, so it isn't interned in skin_names
+    name = abbreviate_wear(unquote(hash_name))
+    if not history:
+        description = f"No price of **{name}** recorded in the last {days} day(s)."
+        return discord.Embed(title=PRICE_HISTORY_TITLE, description=description)
+
+    format_price = PriceFormatter(currency, fx_rates or {})
+    prices = [price for _, price in history]
+    first, last = prices[0], prices[-1]
+    change = last - first
+    description = f"**{name}** — **{format_price(last)}**\n"
+    if first:
+        percent = 100 * change / first
         description += (
-            f":small_blue_diamond: **{unquoted_hash_name}** — **${f"{price:.2f}"}**\n"
+            f"{format_price.change(change)} ({percent:+.2f}%) in {days} day(s)\n"
         )
-    return discord.Embed(title=title, description=description, color=0x68B2FC)
+    description += (
+        f"Low {format_price(min(prices))} · High {format_price(max(prices))}\n"
+    )
+
+    # one bar per UTC day, the day's last price
+    closes = {}
+    for ts, price in history:
+        closes[datetime.fromtimestamp(ts, timezone.utc).date()] = price
+    if len(closes) > 1:
+        description += f"`{render_sparkline(list(closes.values()))}`"
+    return discord.Embed(
+        title=PRICE_HISTORY_TITLE, description=description, color=SKIN_PRICES_COLOR
+    )
 
 
 if __name__ == "__main__":
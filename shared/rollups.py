@@ -0,0 +1,33 @@
+from decimal import Decimal
+import struct
+
+# Packed price rollups of `skinsbot.skin_price_rollups`, written by the workers'
+# compactor and read by the bot. Both use this file through symlinks
+# (bot/models/rollups.py, workers/rollups.py), `zip` bundles its content.
+
+
+def pack_points(points: dict[int, Decimal], period_start: int) -> dict:
+    """
+    Pack {unix_timestamp: price_usd} into two little-endian uint32 arrays:
+    seconds since `period_start` and prices in cents.
+    """
+    timestamps = sorted(points)
+    n = len(timestamps)
+    return {
+        "period_start": period_start,
+        "timestamps": struct.pack(f"<{n}I", *(ts - period_start for ts in timestamps)),
+        "prices": struct.pack(f"<{n}I", *(int(points[ts] * 100) for ts in timestamps)),
+    }
+
+
+def unpack_points(rollup: dict) -> dict[int, Decimal]:
+    period_start = int(rollup["period_start"])
+    offsets = bytes(rollup["timestamps"])
+    cents = bytes(rollup["prices"])
+    n = len(offsets) // 4
+    return {
+        period_start + offset: Decimal(price) / 100
+        for offset, price in zip(
+            struct.unpack(f"<{n}I", offsets), struct.unpack(f"<{n}I", cents)
+        )
+    }
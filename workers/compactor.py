@@ -0,0 +1,164 @@
+from datetime import date, datetime, timedelta, timezone
+import logging
+
+import boto3
+from boto3.dynamodb.conditions import Key
+
+from rollups import pack_points, unpack_points
+from scheduler import scan_all_items
+
+dynamodb_client = boto3.resource("dynamodb")
+skin_prices_table = dynamodb_client.Table("skinsbot.skin_prices")
+skin_price_rollups_table = dynamodb_client.Table("skinsbot.skin_price_rollups")
+skin_stats_table = dynamodb_client.Table("skinsbot.skin_stats")
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SECONDS_PER_DAY = 24 * 3600
+# Raw points expire (DynamoDB TTL on `expires_at`) after this long; compaction
+# must always run well within it
+RAW_PRICE_TTL_SECONDS = 7 * SECONDS_PER_DAY
+# Completed days are packed into a day record after this many days...
+DAY_ROLLUP_AFTER_DAYS = 1
+# ...and day records are merged into week records after this many
+WEEK_ROLLUP_AFTER_DAYS = 28
+
+
+def unix_of(day: date) -> int:
+    return int(datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp())
+
+
+def put_rollup(hash_name: str, period: str, points: dict, period_start: int):
+    skin_price_rollups_table.put_item(
+        Item={"hash_name": hash_name, "period": period}
+        | pack_points(points, period_start)
+    )
+
+
+def roll_up_days(hash_name: str, compacted_until: int, cutoff: int) -> None:
+    """
+    Pack the raw points in [compacted_until, cutoff) into one record per UTC day.
+    Rewriting a day from the same raw points is idempotent. Points written before
+    the TTL was introduced never expire, so they are deleted once packed, whatever
+    their age: the day record holds them from then on.
+    """
+    kwargs = {
+        "KeyConditionExpression": Key("hash_name").eq(hash_name)
+        & Key("unix_timestamp").between(compacted_until, cutoff - 1),
+        "ProjectionExpression": "unix_timestamp, price_usd, expires_at",
+    }
+    days = {}
+    legacy_timestamps = []  # points stored before the TTL existed never expire
+    while True:
+        response = skin_prices_table.query(**kwargs)
+        for item in response.get("Items", []):
+            ts = int(item["unix_timestamp"])
+            day = datetime.fromtimestamp(ts, timezone.utc).date()
+            days.setdefault(day, {})[ts] = item["price_usd"]
+            if "expires_at" not in item:
+                legacy_timestamps.append(ts)
+        if not response.get("LastEvaluatedKey"):
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    for day, points in days.items():
+        put_rollup(hash_name, f"day#{day.isoformat()}", points, unix_of(day))
+
+    with skin_prices_table.batch_writer() as batch:
+        for ts in legacy_timestamps:
+            batch.delete_item(Key={"hash_name": hash_name, "unix_timestamp": ts})
+
+
+def roll_up_weeks(hash_name: str, cutoff_day: date) -> None:
+    """
+    Merge day records older than `cutoff_day` into one record per ISO week
+    (starting on Monday), then delete them. The week record is merged with any
+    existing one, so a rerun after a partial failure loses nothing.
+    """
+    kwargs = {
+        "KeyConditionExpression": Key("hash_name").eq(hash_name)
+        & Key("period").between("day#", f"day#{cutoff_day.isoformat()}")
+    }
+    weeks = {}
+    while True:
+        response = skin_price_rollups_table.query(**kwargs)
+        for rollup in response.get("Items", []):
+            day = date.fromisoformat(rollup["period"].removeprefix("day#"))
+            if day >= cutoff_day:
+                continue
+            week_start = day - timedelta(days=day.weekday())
+            weeks.setdefault(week_start, []).append(rollup)
+        if not response.get("LastEvaluatedKey"):
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    for week_start, day_rollups in weeks.items():
+        period = f"week#{week_start.isoformat()}"
+        existing = skin_price_rollups_table.get_item(
+            Key={"hash_name": hash_name, "period": period}
+        ).get("Item")
+        points = unpack_points(existing) if existing else {}
+        for rollup in day_rollups:
+            points |= unpack_points(rollup)
+        put_rollup(hash_name, period, points, unix_of(week_start))
+
+        with skin_price_rollups_table.batch_writer() as batch:
+            for rollup in day_rollups:
+                batch.delete_item(
+                    Key={"hash_name": hash_name, "period": rollup["period"]}
+                )
+
+
+def compact_hash_name(hash_name: str, compacted_until: int, today: date) -> int:
+    cutoff_day = today - timedelta(days=DAY_ROLLUP_AFTER_DAYS)
+    cutoff = unix_of(cutoff_day)
+    if compacted_until < cutoff:
+        roll_up_days(hash_name, compacted_until, cutoff)
+    roll_up_weeks(hash_name, today - timedelta(days=WEEK_ROLLUP_AFTER_DAYS))
+    return cutoff
+
+
+def get_compacted_untils(from_prices: bool) -> dict[str, int]:
+    """
+    {hash_name: compacted_until} of the hash names to compact: those with a
+    `skinsbot.skin_stats` row, i.e. every skin refreshed since the stats exist.
+
+    With `from_prices`, also every hash name found in `skinsbot.skin_prices`, which
+    takes a scan of the raw points. Only needed once, for the points of skins
+    last refreshed before the stats existed (never expiring, as they predate the
+    TTL too); compacting them creates their stats row.
+    """
+    compacted_untils = {
+        stats["hash_name"]: int(stats.get("compacted_until", 0))
+        for stats in scan_all_items(
+            skin_stats_table, ProjectionExpression="hash_name, compacted_until"
+        )
+    }
+    if from_prices:
+        for item in scan_all_items(skin_prices_table, ProjectionExpression="hash_name"):
+            compacted_untils.setdefault(item["hash_name"], 0)
+    return compacted_untils
+
+
+def handler(event, context):
+    today = datetime.now(timezone.utc).date()
+    from_prices = (event or {}).get("from_prices") == True
+    for hash_name, compacted_until in get_compacted_untils(from_prices).items():
+        try:
+            # the first run packs the whole history stored so far
+            compacted_until = compact_hash_name(hash_name, compacted_until, today)
+            skin_stats_table.update_item(
+                Key={"hash_name": hash_name},
+                UpdateExpression="SET compacted_until = :compacted_until",
+                ExpressionAttributeValues={":compacted_until": compacted_until},
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to compact hash_name={hash_name}. {e}")
+    # update lambda
+    return
+
+
+if __name__ == "__main__":
+    handler({}, None)
@@ -1,5 +1,8 @@
 from decimal import Decimal
 import logging
+import math
+import queue
+import threading
 import time
 from typing import Union
 
@@ -8,25 +11,27 @@ import requests
 from requests.exceptions import JSONDecodeError, RequestException
 from tenacity import retry, stop_after_attempt, wait_fixed
 
+from compactor import RAW_PRICE_TTL_SECONDS, SECONDS_PER_DAY
+from exceptions import DynamodbError, NoInfoFoundError, UnsuccessfulRequestError
+from manifest import delete_part, read_part
+
 dynamodb_client = boto3.resource("dynamodb")
 skin_prices_table = dynamodb_client.Table("skinsbot.skin_prices")
+skin_stats_table = dynamodb_client.Table("skinsbot.skin_stats")
+
+# seconds between Steam requests when processing a manifest part
+STEAM_REQUEST_INTERVAL = 5
+# smoothing factor of the volatility EWMA kept in skinsbot.skin_stats
+VOLATILITY_ALPHA = 0.3
+# capacity of the queues between pipeline stages: a slow stage holds back the
+# ones before it instead of letting them pile up results in memory
+PIPELINE_QUEUE_SIZE = 10
+PIPELINE_DONE = object()  # sentinel closing a pipeline queue
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
-class UnsuccessfulRequestError(Exception):
-    pass
-
-
-class NoInfoFoundError(Exception):
-    pass
-
-
-class DynamodbError(Exception):
-    pass
-
-
 def add_params_to_url(url: str, params: dict[str : Union[int, str]]):
     """
     Append query params to `url` *without* encoding them.
@@ -92,6 +97,8 @@ def add_price_to_dynamodb(hash_name: str, price: float, unix_now: int):
                 "hash_name": hash_name,
                 "unix_timestamp": unix_now,
                 "price_usd": price,
+                # DynamoDB TTL attribute; older points live on in the rollups
+                "expires_at": unix_now + RAW_PRICE_TTL_SECONDS,
             }
         )
         logger.info(f"hash_name={hash_name}; unix_timestamp={unix_now} added to db!")
@@ -100,35 +107,169 @@ def add_price_to_dynamodb(hash_name: str, price: float, unix_now: int):
         raise DynamodbError(str(e))
 
 
-def handler(event, context):
-    hash_name = event.get("hash_name")
+def update_skin_stats(hash_name: str, price: Decimal, unix_now: int):
+    """
+    Record the refresh in `skinsbot.skin_stats`, which the scheduler uses to rank
+    hash names. Volatility is an EWMA of |log return| between refreshes.
+    """
     try:
-        unix_now = int(time.time())
-        price_overview = get_market_price_overview(hash_name)
-        logger.info(f"{hash_name} price_overview:{price_overview.get('body')}")
-
-        cheapest_listing = convert_price_to_decimal(
-            price_overview["body"]["lowest_price"]
+        response = skin_stats_table.get_item(Key={"hash_name": hash_name})
+        stats = response.get("Item", {})
+        volatility = float(stats.get("volatility", 0))
+        last_price = stats.get("last_price")
+        if last_price and price:
+            change = abs(math.log(float(price) / float(last_price)))
+            volatility = VOLATILITY_ALPHA * change + (1 - VOLATILITY_ALPHA) * volatility
+
+        update_expression = (
+            "SET last_refresh = :last_refresh, last_price = :last_price, "
+            "volatility = :volatility"
+        )
+        values = {
+            ":last_refresh": unix_now,
+            ":last_price": price,
+            ":volatility": Decimal(f"{volatility:.6f}"),
+        }
+        # prev_day_price is the last price seen on a previous UTC day, the bot
+        # uses it for daily changes without reading the price history
+        last_refresh = stats.get("last_refresh")
+        if (
+            last_price
+            and int(last_refresh) // SECONDS_PER_DAY < unix_now // SECONDS_PER_DAY
+        ):
+            update_expression += ", prev_day_price = :prev_day_price"
+            values[":prev_day_price"] = last_price
+
+        # update_item keeps the attributes other jobs store on the item
+        skin_stats_table.update_item(
+            Key={"hash_name": hash_name},
+            UpdateExpression=update_expression,
+            ExpressionAttributeValues=values,
         )
 
-        add_price_to_dynamodb(hash_name, cheapest_listing, unix_now)
+    except Exception as e:
+        raise DynamodbError(str(e))
 
-    except RequestException as e:
-        logger.error(f"Failed to fetch price overview for hash_name={hash_name}. {e}")
 
-    except JSONDecodeError as e:
+def log_refresh_error(hash_name: str, e: Exception):
+    if isinstance(e, RequestException):
+        logger.error(f"Failed to fetch price overview for hash_name={hash_name}. {e}")
+    elif isinstance(e, JSONDecodeError):
         logger.error(f"Failed to decode response for hash_name={hash_name}. {e}")
-
-    except (UnsuccessfulRequestError, NoInfoFoundError) as e:
+    elif isinstance(e, (UnsuccessfulRequestError, NoInfoFoundError)):
         logger.error(str(e))
-
-    except DynamodbError as e:
+    elif isinstance(e, DynamodbError):
         logger.error(f"Failed to add hash_name={hash_name} to db. {e}")
-
-    except Exception as e:
+    else:
         logger.error(str(e))
+
+
+def fetch_stage(hash_names: list[str], parse_queue: queue.Queue):
+    """
+    Fetch the price overviews, starting a Steam request every
+    STEAM_REQUEST_INTERVAL seconds. Requests are paced from start to start, so
+    response times and the later stages don't slow the request rate down.
+    """
+    next_request = 0.0
+    try:
+        for hash_name in hash_names:
+            time.sleep(max(0.0, next_request - time.monotonic()))
+            next_request = time.monotonic() + STEAM_REQUEST_INTERVAL
+            unix_now = int(time.time())
+            try:
+                price_overview = get_market_price_overview(hash_name)
+            except Exception as e:
+                log_refresh_error(hash_name, e)
+                continue
+            parse_queue.put((hash_name, unix_now, price_overview))
+    finally:
+        parse_queue.put(PIPELINE_DONE)
+
+
+def parse_stage(parse_queue: queue.Queue, persist_queue: queue.Queue):
+    try:
+        while (entry := parse_queue.get()) is not PIPELINE_DONE:
+            hash_name, unix_now, price_overview = entry
+            try:
+                logger.info(f"{hash_name} price_overview:{price_overview.get('body')}")
+                cheapest_listing = convert_price_to_decimal(
+                    price_overview["body"]["lowest_price"]
+                )
+            except Exception as e:
+                log_refresh_error(hash_name, e)
+                continue
+            persist_queue.put((hash_name, cheapest_listing, unix_now))
+    finally:
+        persist_queue.put(PIPELINE_DONE)
+
+
+def persist_stage(persist_queue: queue.Queue) -> int:
+    # a single writer persists prices in the order the hash names were given
+    n_refreshed = 0
+    while (entry := persist_queue.get()) is not PIPELINE_DONE:
+        hash_name, cheapest_listing, unix_now = entry
+        try:
+            add_price_to_dynamodb(hash_name, cheapest_listing, unix_now)
+            update_skin_stats(hash_name, cheapest_listing, unix_now)
+            n_refreshed += 1
+        except Exception as e:
+            log_refresh_error(hash_name, e)
+    return n_refreshed
+
+
+def refresh_prices(hash_names: list[str]) -> dict:
+    """
+    Refresh the prices of `hash_names` through a fetch -> parse -> persist
+    pipeline. Each stage runs in its own thread (persist in the caller's) with
+    bounded queues in between, so DynamoDB writes overlap the waits on Steam and
+    one invocation keeps requesting at the allowed rate.
+    A failing hash name is logged and skipped, it never stops the batch.
+    """
+    parse_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    persist_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stages = [
+        threading.Thread(target=fetch_stage, args=(hash_names, parse_queue)),
+        threading.Thread(target=parse_stage, args=(parse_queue, persist_queue)),
+    ]
+    for stage in stages:
+        stage.start()
+    n_refreshed = persist_stage(persist_queue)
+    for stage in stages:
+        stage.join()
+
+    logger.info(f"{n_refreshed}/{len(hash_names)} prices refreshed")
+    return {"requested": len(hash_names), "refreshed": n_refreshed}
+
+
+def refresh_price(hash_name: str):
+    return refresh_prices([hash_name])
+
+
+def refresh_manifest_part(manifest_key: str):
+    """
+    Refresh every hash name of a manifest part written by the producer, then
+    delete the part.
+    """
+    items = read_part(manifest_key)
+    summary = refresh_prices([item.get("hash_name") for item in items])
+    delete_part(manifest_key)
+    logger.info(f"{manifest_key} processed ({len(items)} items)")
+    return summary
+
+
+def handler(event, context):
+    """
+    Accepts one of:
+        - {"manifest_key": str}: a manifest part written by the producer
+        - {"hash_names": list[str]}: a batch of hash names
+        - {"hash_name": str}: a single hash name
+    """
+    if event.get("manifest_key"):
+        return refresh_manifest_part(event["manifest_key"])
+    if event.get("hash_names"):
+        return refresh_prices(event["hash_names"])
     # update lambda
-    return
+    return refresh_price(event.get("hash_name"))
 
 
 if __name__ == "__main__":
@@ -139,7 +280,4 @@ if __name__ == "__main__":
         "AWP%20%7C%20Redline%20%28Minimal%20Wear%29",
         "M4A4%20%7C%20Desolate%20Space%20%28Field-Tested%29",
     ]
-    for hash_name in hash_names:
-        event = {"hash_name": hash_name}
-        handler(event, None)
-        time.sleep(5)
+    print(handler({"hash_names": hash_names}, None))
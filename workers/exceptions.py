@@ -0,0 +1,10 @@
+class UnsuccessfulRequestError(Exception):
+    pass
+
+
+class NoInfoFoundError(Exception):
+    pass
+
+
+class DynamodbError(Exception):
+    pass
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+import logging
+import os
+
+import boto3
+import requests
+from tenacity import retry, stop_after_attempt, wait_fixed
+
+from exceptions import UnsuccessfulRequestError
+
+dynamodb_client = boto3.resource("dynamodb")
+fx_rates_table = dynamodb_client.Table("skinsbot.fx_rates")
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Any endpoint answering {"rates": {"EUR": 0.92, ...}} for a USD base works
+FX_RATES_URL = os.getenv("FX_RATES_URL", "https://open.er-api.com/v6/latest/USD")
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_fixed(5))
+def get_usd_rates() -> dict[str, Decimal]:
+    response = requests.get(FX_RATES_URL, timeout=10)
+    if response.status_code != 200:
+        raise UnsuccessfulRequestError(
+            f"Unsuccessful FX rates response. status_code={response.status_code}"
+        )
+    # parse_float keeps the rates exact, DynamoDB doesn't accept floats anyway
+    rates = response.json(parse_float=Decimal)["rates"]
+    return {currency: Decimal(rate) for currency, rate in rates.items()}
+
+
+def refresh_fx_rates() -> None:
+    """
+    Store today's USD exchange rates in `skinsbot.fx_rates`.
+
+    Prices are only ever fetched in USD; the bot converts them at render time.
+    Both a dated item (history) and the `latest` item the bot reads are written.
+    A failure is logged and leaves the previous rates in place.
+    """
+    try:
+        rates = get_usd_rates()
+        today = datetime.now(timezone.utc).date().isoformat()
+        for key in (today, "latest"):
+            fx_rates_table.put_item(
+                Item={"date": key, "base": "USD", "as_of": today, "rates": rates}
+            )
+        logger.info(f"FX rates refreshed for {today} ({len(rates)} currencies)")
+
+    except Exception as e:
+        logger.error(f"Failed to refresh FX rates. {type(e).__name__}: {e}")
+
+
+def handler(event, context):
+    # A lambda of its own, so a slow or failing rates API never holds up the
+    # producer and the price run
+    refresh_fx_rates()
+    # update lambda
+    return
+
+
+if __name__ == "__main__":
+    handler({}, None)
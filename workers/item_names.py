@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import time
+
+import boto3
+import requests
+from tenacity import retry, stop_after_attempt, wait_fixed
+
+from exceptions import UnsuccessfulRequestError
+
+s3_client = boto3.client("s3")
+lambda_client = boto3.client("lambda")
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+ITEM_NAMES_BUCKET = os.getenv("ITEM_NAMES_BUCKET")
+ITEM_NAMES_KEY = os.getenv("ITEM_NAMES_KEY", "skinsbot/item_names/item_names.txt")
+ITEM_NAMES_PARTS_PREFIX = "skinsbot/item_names/parts/"
+PAGE_SIZE = 100  # maximum allowed by the search endpoint
+SECONDS_BETWEEN_PAGES = 5
+# stop fetching when less than this is left before the lambda timeout
+MIN_REMAINING_MS = 60_000
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_fixed(10))
+def get_search_page(start: int) -> dict:
+    """
+    Fetch one page of CS2 items from the Steam Market search, sorted by name.
+
+    Response body (relevant fields):
+        - total_count (int): number of items on the market
+        - results (list): items with `hash_name` and `sell_listings`
+    """
+    url = "https://steamcommunity.com/market/search/render/"
+    params = {
+        "appid": 730,  # CS2 appid
+        "norender": 1,
+        "search_descriptions": 0,
+        "sort_column": "name",
+        "sort_dir": "asc",
+        "start": start,
+        "count": PAGE_SIZE,
+    }
+    response = requests.get(url, params=params)
+
+    if response.status_code != 200:
+        raise UnsuccessfulRequestError(
+            f"Unsuccessful search response for start={start}. status_code={response.status_code}"
+        )
+    return response.json()
+
+
+def list_keys(prefix: str) -> list[str]:
+    # list_objects_v2 returns at most 1000 keys per call
+    keys = []
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=ITEM_NAMES_BUCKET, Prefix=prefix):
+        keys.extend(obj["Key"] for obj in page.get("Contents", []))
+    return keys
+
+
+def delete_keys(keys: list[str]) -> None:
+    for key in keys:
+        s3_client.delete_object(Bucket=ITEM_NAMES_BUCKET, Key=key)
+
+
+def merge_parts(run_id: str) -> int:
+    """
+    Concatenate the parts of the chain `run_id` into ITEM_NAMES_KEY (one plain
+    hash name per line, sorted) and delete them.
+    """
+    keys = list_keys(f"{ITEM_NAMES_PARTS_PREFIX}{run_id}/")
+    names = set()
+    for key in keys:
+        body = s3_client.get_object(Bucket=ITEM_NAMES_BUCKET, Key=key)["Body"]
+        names.update(name for name in body.read().decode().splitlines() if name)
+
+    s3_client.put_object(
+        Bucket=ITEM_NAMES_BUCKET,
+        Key=ITEM_NAMES_KEY,
+        Body="\n".join(sorted(names)).encode(),
+    )
+    delete_keys(keys)
+    return len(names)
+
+
+def handler(event, context):
+    """
+    Refresh the list of market hash names the bot uses for fuzzy matching.
+
+    The full market takes longer to page through than a lambda may run, so each
+    invocation fetches pages until it is close to its timeout, stores them as a
+    part and invokes itself with the next `start`. The last one merges the parts.
+    Only items with active listings are kept, as those are the ones trackable.
+
+    Parts are stored under the `run_id` of the chain, so the merge never picks up
+    parts of a chain that failed halfway. Those are deleted by the next chain.
+    """
+    event = event or {}
+    start = event.get("start", 0)
+    run_id = event.get("run_id")
+    if run_id is None:
+        # first invocation of a chain
+        delete_keys(list_keys(ITEM_NAMES_PARTS_PREFIX))
+        run_id = context.aws_request_id if context else str(int(time.time()))
+    names = []
+    total_count = None
+    while total_count is None or start < total_count:
+        if context and context.get_remaining_time_in_millis() < MIN_REMAINING_MS:
+            break
+        if total_count is not None:
+            time.sleep(SECONDS_BETWEEN_PAGES)
+
+        page = get_search_page(start)
+        total_count = page.get("total_count", 0)
+        results = page.get("results") or []
+        if not results:
+            logger.error(f"No results at start={start}, total_count={total_count}")
+            total_count = start
+            break
+        names.extend(r["hash_name"] for r in results if r.get("sell_listings"))
+        start += len(results)
+
+    s3_client.put_object(
+        Bucket=ITEM_NAMES_BUCKET,
+        Key=f"{ITEM_NAMES_PARTS_PREFIX}{run_id}/{start:06d}.txt",
+        Body="\n".join(names).encode(),
+    )
+    logger.info(f"{len(names)} item names fetched, next start={start}")
+
+    if total_count is not None and start < total_count and context:
+        lambda_client.invoke(
+            FunctionName=context.function_name,
+            InvocationType="Event",
+            Payload=json.dumps({"start": start, "run_id": run_id}).encode(),
+        )
+        return {"start": start, "done": False}
+
+    n_names = merge_parts(run_id)
+    logger.info(f"{ITEM_NAMES_KEY} refreshed with {n_names} item names")
+    # update lambda
+    return {"start": start, "done": True}
+
+
+if __name__ == "__main__":
+    print(handler({}, None))
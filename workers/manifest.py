@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+
+import boto3
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+s3_client = boto3.client("s3")
+
+MANIFEST_BUCKET = os.getenv("MANIFEST_BUCKET")
+MANIFEST_PREFIX = os.getenv("MANIFEST_PREFIX", "skinsbot/manifests")
+MANIFEST_DIR = os.getenv("MANIFEST_DIR")  # local alternative to S3, for dev runs
+# Items per part; one consumer invocation processes one part
+MANIFEST_PART_SIZE = int(os.getenv("MANIFEST_PART_SIZE", "100"))
+
+
+def is_streaming_enabled() -> bool:
+    return bool(MANIFEST_BUCKET or MANIFEST_DIR)
+
+
+def put_part(key: str, body: str) -> None:
+    if MANIFEST_BUCKET:
+        s3_client.put_object(Bucket=MANIFEST_BUCKET, Key=key, Body=body.encode())
+        return
+
+    path = os.path.join(MANIFEST_DIR, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(body)
+
+
+def read_part(key: str) -> list[dict]:
+    if MANIFEST_BUCKET:
+        response = s3_client.get_object(Bucket=MANIFEST_BUCKET, Key=key)
+        body = response["Body"].read().decode()
+    else:
+        with open(os.path.join(MANIFEST_DIR, key)) as f:
+            body = f.read()
+    return [json.loads(line) for line in body.splitlines() if line]
+
+
+def delete_part(key: str) -> None:
+    if MANIFEST_BUCKET:
+        s3_client.delete_object(Bucket=MANIFEST_BUCKET, Key=key)
+    else:
+        os.remove(os.path.join(MANIFEST_DIR, key))
+
+
+class ManifestWriter:
+    """
+    Writes work items as JSONL parts under `<MANIFEST_PREFIX>/<run_id>/`.
+
+    Each part is flushed as soon as it holds MANIFEST_PART_SIZE items, so only one
+    part is ever kept in memory and the Step Functions payload is just the prefix.
+    """
+
+    def __init__(self, run_id: str):
+        self.prefix = f"{MANIFEST_PREFIX}/{run_id}/"
+        self.buffer = []
+        self.n_parts = 0
+        self.n_items = 0
+
+    def write(self, item: dict) -> None:
+        self.buffer.append(item)
+        self.n_items += 1
+        if len(self.buffer) >= MANIFEST_PART_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        key = f"{self.prefix}part-{self.n_parts:05d}.jsonl"
+        put_part(key, "".join(json.dumps(item) + "\n" for item in self.buffer))
+        logger.info(f"{key} written with {len(self.buffer)} items")
+        self.n_parts += 1
+        self.buffer = []
+
+    def close(self) -> dict:
+        self.flush()
+        return {
+            "bucket": MANIFEST_BUCKET,
+            "prefix": self.prefix,
+            "parts": self.n_parts,
+            "count": self.n_items,
+        }
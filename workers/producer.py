@@ -1,32 +1,27 @@
-import boto3
+import time
 
-dynamodb_client = boto3.resource("dynamodb")
-tracked_skins_table = dynamodb_client.Table("skinsbot.tracked_skins")
+from manifest import ManifestWriter, is_streaming_enabled
+from scheduler import get_hash_names_to_refresh, iter_tracked_hash_names
 
 
 def handler(event, context):
-    unique_tracked_skins = set()
-    LastEvaluatedKey = None
-    while True:
-        kwargs = {"ProjectionExpression": "hash_name"}
-        if LastEvaluatedKey is not None:
-            kwargs["ExclusiveStartKey"] = LastEvaluatedKey
-
-        response = tracked_skins_table.scan(**kwargs)
-        for item in response.get("Items"):
-            unique_tracked_skins.add(item.get("hash_name", None))
-
-        if not response.get("LastEvaluatedKey"):
-            # all the data has been scanned
-            break
-
-        LastEvaluatedKey = response.get("LastEvaluatedKey")
-
-    # if, for some reason, None has been added, it will be removed
-    unique_tracked_skins.add(None)  # adding to avoid a KeyError
-    unique_tracked_skins.remove(None)
+    if (event or {}).get("refresh_all") == True:
+        # manual override: refresh every tracked skin regardless of the schedule
+        hash_names = iter_tracked_hash_names()
+    else:
+        hash_names = get_hash_names_to_refresh()
+
+    if not is_streaming_enabled():
+        return [{"hash_name": hn} for hn in hash_names]
+
+    # Streaming mode: work items go to a JSONL manifest part by part and only its
+    # location is returned, keeping the state payload constant in size
+    run_id = context.aws_request_id if context else str(int(time.time()))
+    writer = ManifestWriter(run_id)
+    for hash_name in hash_names:
+        writer.write({"hash_name": hash_name})
     # update lambda
-    return [{"hash_name": hn} for hn in unique_tracked_skins]
+    return writer.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+../shared/rollups.py
\ No newline at end of file
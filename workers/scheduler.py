@@ -0,0 +1,189 @@
+import logging
+import math
+import os
+import time
+
+import boto3
+
+dynamodb_client = boto3.resource("dynamodb")
+tracked_skins_table = dynamodb_client.Table("skinsbot.tracked_skins")
+portfolios_table = dynamodb_client.Table("skinsbot.portfolios")
+skin_stats_table = dynamodb_client.Table("skinsbot.skin_stats")
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SECONDS_PER_DAY = 24 * 3600
+# Steam requests the workers may spend per day, spread over RUNS_PER_DAY runs
+DAILY_REQUEST_BUDGET = int(os.getenv("DAILY_REQUEST_BUDGET", "2000"))
+RUNS_PER_DAY = int(os.getenv("RUNS_PER_DAY", "6"))
+# The bot only shows prices from the last 24h, so every skin needs a daily refresh
+MIN_REFRESHES_PER_DAY = 1
+# How much a skin's volatility (EWMA of |log return|) boosts its priority
+VOLATILITY_WEIGHT = float(os.getenv("VOLATILITY_WEIGHT", "50"))
+
+
+def scan_all_items(table, **kwargs):
+    """
+    Yield every item of a DynamoDB scan, following `LastEvaluatedKey` page by page.
+    """
+    LastEvaluatedKey = None
+    while True:
+        if LastEvaluatedKey is not None:
+            kwargs["ExclusiveStartKey"] = LastEvaluatedKey
+
+        response = table.scan(**kwargs)
+        yield from response.get("Items", [])
+
+        if not response.get("LastEvaluatedKey"):
+            # all the data has been scanned
+            return
+
+        LastEvaluatedKey = response.get("LastEvaluatedKey")
+
+
+def iter_guild_hash_name_rows():
+    """
+    Yield the hash name of every tracked skin and portfolio holding, once per
+    guild. Both tables are keyed by (guild_id, hash_name), so within a table one
+    row == one guild; holdings of skins the guild also tracks are skipped.
+    """
+    tracked = set()
+    for item in scan_all_items(
+        tracked_skins_table, ProjectionExpression="guild_id, hash_name"
+    ):
+        if item.get("hash_name"):
+            tracked.add((item["guild_id"], item["hash_name"]))
+            yield item["hash_name"]
+
+    for item in scan_all_items(
+        portfolios_table, ProjectionExpression="guild_id, hash_name"
+    ):
+        if (
+            item.get("hash_name")
+            and (item["guild_id"], item["hash_name"]) not in tracked
+        ):
+            yield item["hash_name"]
+
+
+def get_guild_counts() -> dict[str, int]:
+    guild_counts = {}
+    for hash_name in iter_guild_hash_name_rows():
+        guild_counts[hash_name] = guild_counts.get(hash_name, 0) + 1
+    return guild_counts
+
+
+def iter_tracked_hash_names():
+    """
+    Yield each tracked hash name once, as the scan pages come in.
+    """
+    seen = set()
+    for hash_name in iter_guild_hash_name_rows():
+        if hash_name not in seen:
+            seen.add(hash_name)
+            yield hash_name
+
+
+def get_skin_stats() -> dict[str, dict]:
+    return {
+        item["hash_name"]: item
+        for item in scan_all_items(
+            skin_stats_table,
+            ProjectionExpression="hash_name, last_refresh, volatility",
+        )
+    }
+
+
+def get_priority_weight(guild_count: int, stats: dict | None) -> float:
+    volatility = float((stats or {}).get("volatility", 0))
+    return guild_count * (1 + VOLATILITY_WEIGHT * volatility)
+
+
+def allocate_daily_refreshes(
+    weights: dict[str, float], budget: int
+) -> dict[str, float]:
+    """
+    Split `budget` daily Steam requests across hash names.
+
+    Minimising the weighted average staleness (weight / refreshes) under a fixed
+    budget gives each hash name a share proportional to sqrt(weight). Shares are
+    clamped to [MIN_REFRESHES_PER_DAY, RUNS_PER_DAY] and the budget freed (or used)
+    by clamped names is redistributed among the rest.
+    """
+    allocation = {}
+    remaining = dict(weights)
+    remaining_budget = float(budget)
+    while remaining:
+        total = sum(math.sqrt(w) for w in remaining.values())
+        shares = {
+            hn: remaining_budget * math.sqrt(w) / total for hn, w in remaining.items()
+        }
+
+        clamped = {
+            hn: MIN_REFRESHES_PER_DAY
+            for hn, share in shares.items()
+            if share < MIN_REFRESHES_PER_DAY
+        }
+        if not clamped:
+            clamped = {
+                hn: RUNS_PER_DAY for hn, share in shares.items() if share > RUNS_PER_DAY
+            }
+        if not clamped:
+            allocation.update(shares)
+            break
+
+        for hn, share in clamped.items():
+            allocation[hn] = share
+            remaining_budget -= share
+            del remaining[hn]
+
+    return allocation
+
+
+def select_due_hash_names(
+    unix_now: int, guild_counts: dict[str, int], stats: dict[str, dict]
+) -> list[str]:
+    """
+    Pick the hash names to refresh in this run, most urgent first.
+
+    A hash name is due once its age reaches its refresh interval (with half a run
+    of slack, so it isn't pushed to the next run and left stale for hours).
+    Urgency is weight * age / interval; never refreshed skins go first.
+    """
+    weights = {
+        hn: get_priority_weight(count, stats.get(hn))
+        for hn, count in guild_counts.items()
+    }
+    allocation = allocate_daily_refreshes(weights, DAILY_REQUEST_BUDGET)
+    run_period = SECONDS_PER_DAY / RUNS_PER_DAY
+
+    candidates = []
+    for hash_name, refreshes_per_day in allocation.items():
+        interval = SECONDS_PER_DAY / refreshes_per_day
+        last_refresh = stats.get(hash_name, {}).get("last_refresh")
+        if last_refresh is None:
+            candidates.append((math.inf, hash_name))
+            continue
+
+        age = unix_now - int(last_refresh)
+        if age + run_period / 2 < interval:
+            continue
+        candidates.append((weights[hash_name] * age / interval, hash_name))
+
+    candidates.sort(reverse=True)
+    per_run_budget = math.ceil(DAILY_REQUEST_BUDGET / RUNS_PER_DAY)
+    if len(candidates) > per_run_budget:
+        logger.info(
+            f"{len(candidates)} hash names due, only {per_run_budget} fit this run"
+        )
+    return [hash_name for _, hash_name in candidates[:per_run_budget]]
+
+
+def get_hash_names_to_refresh(unix_now: int | None = None) -> list[str]:
+    if unix_now is None:
+        unix_now = int(time.time())
+    return select_due_hash_names(unix_now, get_guild_counts(), get_skin_stats())
+
+
+if __name__ == "__main__":
+    print(get_hash_names_to_refresh())
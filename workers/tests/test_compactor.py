@@ -0,0 +1,174 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+
+import compactor
+from rollups import pack_points, unpack_points
+
+
+class FakeBatchWriter:
+    def __init__(self, table):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def delete_item(self, Key):
+        self.table.deleted.append(Key)
+
+
+class FakeTable:
+    """
+    Returns the given query pages in turn; the key conditions are not evaluated.
+    """
+
+    def __init__(self, pages=(), items=None):
+        self.pages = list(pages)
+        self.items = items or {}
+        self.queries = []
+        self.put = []
+        self.deleted = []
+
+    def query(self, **kwargs):
+        self.queries.append(kwargs)
+        page = len(self.queries) - 1
+        response = {"Items": self.pages[page] if page < len(self.pages) else []}
+        if page + 1 < len(self.pages):
+            response["LastEvaluatedKey"] = {"page": page}
+        return response
+
+    def get_item(self, Key):
+        item = self.items.get((Key["hash_name"], Key["period"]))
+        return {"Item": item} if item else {}
+
+    def put_item(self, Item):
+        self.put.append(Item)
+
+    def batch_writer(self):
+        return FakeBatchWriter(self)
+
+
+@pytest.fixture
+def tables(monkeypatch):
+    prices, rollups = FakeTable(), FakeTable()
+    monkeypatch.setattr(compactor, "skin_prices_table", prices)
+    monkeypatch.setattr(compactor, "skin_price_rollups_table", rollups)
+    return prices, rollups
+
+
+def test_pack_points_round_trip():
+    points = {1_700_000_100: Decimal("3.47"), 1_700_000_000: Decimal("0.03")}
+
+    rollup = pack_points(points, period_start=1_699_999_000)
+
+    assert len(rollup["timestamps"]) == len(rollup["prices"]) == 2 * 4
+    assert unpack_points(rollup) == points
+
+
+def test_pack_points_keeps_whole_cents():
+    rollup = pack_points({100: Decimal("1234.56")}, period_start=0)
+
+    assert unpack_points(rollup) == {100: Decimal("1234.56")}
+    assert unpack_points(pack_points({}, period_start=0)) == {}
+
+
+def test_roll_up_days_packs_one_record_per_utc_day(tables):
+    prices, rollups = tables
+    day = date(2026, 1, 5)
+    start = compactor.unix_of(day)
+    prices.pages = [
+        [
+            {
+                "unix_timestamp": start + 10,
+                "price_usd": Decimal("1.00"),
+                "expires_at": 0,
+            },
+            {
+                "unix_timestamp": start + 20,
+                "price_usd": Decimal("1.10"),
+                "expires_at": 0,
+            },
+        ],
+        [{"unix_timestamp": start + 86_400 + 5, "price_usd": Decimal("1.20")}],
+    ]
+
+    compactor.roll_up_days("AK", start, start + 2 * 86_400)
+
+    assert len(prices.queries) == 2
+    assert prices.queries[1]["ExclusiveStartKey"] == {"page": 0}
+    by_period = {item["period"]: item for item in rollups.put}
+    assert set(by_period) == {"day#2026-01-05", "day#2026-01-06"}
+    assert unpack_points(by_period["day#2026-01-05"]) == {
+        start + 10: Decimal("1.00"),
+        start + 20: Decimal("1.10"),
+    }
+    # only the point stored without a TTL is deleted
+    assert prices.deleted == [{"hash_name": "AK", "unix_timestamp": start + 86_405}]
+
+
+def test_roll_up_weeks_merges_paginated_days_and_existing_week(tables):
+    _, rollups = tables
+    monday = date(2026, 1, 5)
+
+    def day_rollup(day, price):
+        return {
+            "hash_name": "AK",
+            "period": f"day#{day.isoformat()}",
+        } | pack_points({compactor.unix_of(day) + 60: price}, compactor.unix_of(day))
+
+    tuesday, next_monday = monday + timedelta(days=1), monday + timedelta(days=7)
+    rollups.pages = [
+        [day_rollup(tuesday, Decimal("2.00"))],
+        [day_rollup(next_monday, Decimal("3.00"))],
+    ]
+    existing = pack_points({compactor.unix_of(monday): Decimal("1.00")}, 0)
+    rollups.items[("AK", "week#2026-01-05")] = existing
+
+    compactor.roll_up_weeks("AK", cutoff_day=next_monday + timedelta(days=1))
+
+    by_period = {item["period"]: item for item in rollups.put}
+    assert set(by_period) == {"week#2026-01-05", "week#2026-01-12"}
+    assert unpack_points(by_period["week#2026-01-05"]) == {
+        compactor.unix_of(monday): Decimal("1.00"),
+        compactor.unix_of(tuesday) + 60: Decimal("2.00"),
+    }
+    assert sorted(key["period"] for key in rollups.deleted) == [
+        "day#2026-01-06",
+        "day#2026-01-12",
+    ]
+
+
+def test_roll_up_weeks_keeps_days_from_the_cutoff_on(tables):
+    _, rollups = tables
+    cutoff_day = date(2026, 1, 7)
+    start = compactor.unix_of(cutoff_day)
+    rollups.pages = [
+        [
+            {"hash_name": "AK", "period": f"day#{cutoff_day.isoformat()}"}
+            | pack_points({start: Decimal("1.00")}, start)
+        ]
+    ]
+
+    compactor.roll_up_weeks("AK", cutoff_day)
+
+    assert rollups.put == []
+    assert rollups.deleted == []
+
+
+def test_get_compacted_untils_adds_price_only_hash_names(monkeypatch):
+    scans = {
+        "stats": [{"hash_name": "AK", "compacted_until": Decimal(100)}],
+        "prices": [{"hash_name": "AK"}, {"hash_name": "M4"}],
+    }
+    monkeypatch.setattr(compactor, "skin_stats_table", "stats")
+    monkeypatch.setattr(compactor, "skin_prices_table", "prices")
+    monkeypatch.setattr(
+        compactor, "scan_all_items", lambda table, **kwargs: iter(scans[table])
+    )
+
+    assert compactor.get_compacted_untils(from_prices=False) == {"AK": 100}
+    assert compactor.get_compacted_untils(from_prices=True) == {"AK": 100, "M4": 0}
@@ -0,0 +1,123 @@
+from decimal import Decimal
+import math
+import queue
+
+import pytest
+
+import consumer
+from consumer import PIPELINE_DONE
+from exceptions import DynamodbError, NoInfoFoundError
+
+
+def overview(price: str) -> dict:
+    return {"status": 200, "body": {"lowest_price": price}, "text": ""}
+
+
+@pytest.fixture
+def steam(monkeypatch):
+    """
+    {hash_name: price overview or exception} answered by the fake Steam; the
+    persisted (hash_name, price) pairs are collected in `steam["persisted"]`.
+    """
+    responses = {"persisted": []}
+
+    def get_market_price_overview(hash_name):
+        response = responses[hash_name]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def add_price_to_dynamodb(hash_name, price, unix_now):
+        if hash_name == "db-error":
+            raise DynamodbError("throttled")
+        responses["persisted"].append((hash_name, price))
+
+    monkeypatch.setattr(consumer, "STEAM_REQUEST_INTERVAL", 0)
+    monkeypatch.setattr(
+        consumer, "get_market_price_overview", get_market_price_overview
+    )
+    monkeypatch.setattr(consumer, "add_price_to_dynamodb", add_price_to_dynamodb)
+    monkeypatch.setattr(consumer, "update_skin_stats", lambda *args: None)
+    return responses
+
+
+def test_refresh_prices_persists_in_order_and_skips_failures(steam):
+    hash_names = [f"skin{i}" for i in range(3 * consumer.PIPELINE_QUEUE_SIZE)]
+    steam |= {hash_name: overview(f"${i}.50") for i, hash_name in enumerate(hash_names)}
+    steam |= {
+        "no-info": NoInfoFoundError("no price"),
+        "bad-body": {"status": 200, "body": {}, "text": ""},
+        "db-error": overview("$1.00"),
+    }
+
+    summary = consumer.refresh_prices(["no-info", "bad-body", "db-error"] + hash_names)
+
+    assert summary == {"requested": len(hash_names) + 3, "refreshed": len(hash_names)}
+    assert steam["persisted"] == [
+        (hash_name, Decimal(f"{i}.50")) for i, hash_name in enumerate(hash_names)
+    ]
+
+
+def test_fetch_stage_closes_the_queue_when_it_fails():
+    def hash_names():
+        yield from ()
+        raise RuntimeError("manifest unreadable")
+
+    parse_queue = queue.Queue()
+    with pytest.raises(RuntimeError):
+        consumer.fetch_stage(hash_names(), parse_queue)
+
+    assert parse_queue.get_nowait() is PIPELINE_DONE
+
+
+def test_parse_stage_forwards_the_sentinel():
+    parse_queue, persist_queue = queue.Queue(), queue.Queue()
+    for entry in [
+        ("a", 1, overview("$2.00")),
+        ("b", 1, {"body": None}),
+        PIPELINE_DONE,
+    ]:
+        parse_queue.put(entry)
+
+    consumer.parse_stage(parse_queue, persist_queue)
+
+    assert persist_queue.get_nowait() == ("a", Decimal("2.00"), 1)
+    assert persist_queue.get_nowait() is PIPELINE_DONE
+
+
+class FakeStatsTable:
+    def __init__(self, item):
+        self.item = item
+        self.updates = []
+
+    def get_item(self, Key):
+        return {"Item": self.item} if self.item else {}
+
+    def update_item(self, **kwargs):
+        self.updates.append(kwargs["ExpressionAttributeValues"])
+
+
+def test_update_skin_stats_tracks_volatility_and_the_previous_day(monkeypatch):
+    day = consumer.SECONDS_PER_DAY
+    table = FakeStatsTable(
+        {"last_price": Decimal("2.00"), "last_refresh": 10 * day, "volatility": 0}
+    )
+    monkeypatch.setattr(consumer, "skin_stats_table", table)
+
+    consumer.update_skin_stats("AK", Decimal("2.20"), 11 * day + 60)
+
+    values = table.updates[0]
+    assert float(values[":volatility"]) == pytest.approx(
+        consumer.VOLATILITY_ALPHA * math.log(1.1), abs=1e-6
+    )
+    assert values[":prev_day_price"] == Decimal("2.00")
+
+
+def test_update_skin_stats_of_a_new_skin(monkeypatch):
+    table = FakeStatsTable(None)
+    monkeypatch.setattr(consumer, "skin_stats_table", table)
+
+    consumer.update_skin_stats("AK", Decimal("2.00"), 100)
+
+    assert table.updates[0][":volatility"] == 0
+    assert ":prev_day_price" not in table.updates[0]
@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+import fx
+
+
+class FakeTable:
+    def __init__(self):
+        self.put = []
+
+    def put_item(self, Item):
+        self.put.append(Item)
+
+
+def test_refresh_fx_rates_writes_the_dated_and_latest_items(monkeypatch):
+    table = FakeTable()
+    monkeypatch.setattr(fx, "fx_rates_table", table)
+    monkeypatch.setattr(fx, "get_usd_rates", lambda: {"EUR": Decimal("0.92")})
+
+    fx.handler({}, None)
+
+    assert table.put[1]["date"] == "latest"
+    assert table.put[0]["date"] == table.put[0]["as_of"] == table.put[1]["as_of"]
+    assert all(item["rates"] == {"EUR": Decimal("0.92")} for item in table.put)
+
+
+def test_refresh_fx_rates_keeps_the_previous_rates_on_failure(monkeypatch):
+    table = FakeTable()
+    monkeypatch.setattr(fx, "fx_rates_table", table)
+
+    def get_usd_rates():
+        raise fx.UnsuccessfulRequestError("status_code=503")
+
+    monkeypatch.setattr(fx, "get_usd_rates", get_usd_rates)
+
+    fx.handler({}, None)
+
+    assert table.put == []
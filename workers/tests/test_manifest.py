@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+import manifest
+
+
+@pytest.fixture
+def manifest_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(manifest, "MANIFEST_BUCKET", None)
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", str(tmp_path))
+    monkeypatch.setattr(manifest, "MANIFEST_PART_SIZE", 2)
+    return tmp_path
+
+
+def test_manifest_writer_flushes_full_parts(manifest_dir):
+    writer = manifest.ManifestWriter("run-1")
+    for i in range(5):
+        writer.write({"hash_name": f"skin{i}"})
+    summary = writer.close()
+
+    assert summary == {
+        "bucket": None,
+        "prefix": f"{manifest.MANIFEST_PREFIX}/run-1/",
+        "parts": 3,
+        "count": 5,
+    }
+    part_dir = manifest_dir / manifest.MANIFEST_PREFIX / "run-1"
+    assert sorted(os.listdir(part_dir)) == [
+        "part-00000.jsonl",
+        "part-00001.jsonl",
+        "part-00002.jsonl",
+    ]
+
+
+def test_manifest_parts_round_trip(manifest_dir):
+    writer = manifest.ManifestWriter("run-1")
+    for i in range(3):
+        writer.write({"hash_name": f"skin{i}"})
+    writer.close()
+    key = f"{writer.prefix}part-00001.jsonl"
+
+    assert manifest.read_part(key) == [{"hash_name": "skin2"}]
+    manifest.delete_part(key)
+    assert not (manifest_dir / key).exists()
+
+
+def test_manifest_writer_writes_no_empty_part(manifest_dir):
+    writer = manifest.ManifestWriter("run-1")
+    for i in range(2):
+        writer.write({"hash_name": f"skin{i}"})
+
+    assert writer.close()["parts"] == 1
+    assert manifest.ManifestWriter("run-2").close()["parts"] == 0
+
+
+def test_streaming_is_disabled_without_a_destination(monkeypatch):
+    monkeypatch.setattr(manifest, "MANIFEST_BUCKET", None)
+    monkeypatch.setattr(manifest, "MANIFEST_DIR", None)
+
+    assert not manifest.is_streaming_enabled()
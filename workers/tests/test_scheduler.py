@@ -0,0 +1,127 @@
+import math
+
+import pytest
+
+import scheduler
+
+
+def test_allocate_daily_refreshes_spends_the_budget_in_sqrt_weight_shares():
+    allocation = scheduler.allocate_daily_refreshes({"a": 1, "b": 4}, budget=6)
+
+    assert sum(allocation.values()) == pytest.approx(6)
+    assert allocation["b"] == pytest.approx(2 * allocation["a"])
+
+
+def test_allocate_daily_refreshes_gives_every_name_a_daily_refresh():
+    weights = {"popular": 10_000, "rare": 1, "rarer": 1}
+    allocation = scheduler.allocate_daily_refreshes(weights, budget=5)
+
+    assert allocation["rare"] == scheduler.MIN_REFRESHES_PER_DAY
+    assert allocation["rarer"] == scheduler.MIN_REFRESHES_PER_DAY
+    assert allocation["popular"] == pytest.approx(3)
+
+
+def test_allocate_daily_refreshes_caps_at_one_refresh_per_run():
+    allocation = scheduler.allocate_daily_refreshes({"a": 1, "b": 1}, budget=1000)
+
+    assert allocation == {
+        "a": scheduler.RUNS_PER_DAY,
+        "b": scheduler.RUNS_PER_DAY,
+    }
+
+
+def test_allocate_daily_refreshes_redistributes_the_budget_freed_by_the_cap():
+    weights = {"hot": 100, "a": 1, "b": 1}
+    allocation = scheduler.allocate_daily_refreshes(weights, budget=14)
+
+    assert allocation["hot"] == scheduler.RUNS_PER_DAY
+    assert allocation["a"] == pytest.approx(4)
+    assert allocation["b"] == pytest.approx(4)
+
+
+def test_get_priority_weight_boosts_volatile_skins():
+    assert scheduler.get_priority_weight(3, None) == 3
+    assert scheduler.get_priority_weight(3, {"volatility": "0.02"}) == pytest.approx(
+        3 * (1 + scheduler.VOLATILITY_WEIGHT * 0.02)
+    )
+
+
+def test_select_due_hash_names_puts_never_refreshed_skins_first():
+    now = 10 * scheduler.SECONDS_PER_DAY
+    stats = {
+        "old": {"last_refresh": now - scheduler.SECONDS_PER_DAY},
+        "fresh": {"last_refresh": now - 60},
+    }
+    guild_counts = {"old": 5, "fresh": 5, "new": 1}
+
+    due = scheduler.select_due_hash_names(now, guild_counts, stats)
+
+    assert due == ["new", "old"]
+
+
+def test_select_due_hash_names_ranks_by_weight_and_age(monkeypatch):
+    monkeypatch.setattr(scheduler, "DAILY_REQUEST_BUDGET", 12)
+    now = 10 * scheduler.SECONDS_PER_DAY
+    day_ago = {"last_refresh": now - scheduler.SECONDS_PER_DAY}
+    guild_counts = {"a": 1, "b": 9}
+
+    due = scheduler.select_due_hash_names(
+        now, guild_counts, {"a": day_ago, "b": day_ago}
+    )
+
+    assert due == ["b", "a"]
+
+
+def test_select_due_hash_names_keeps_to_the_run_budget(monkeypatch):
+    monkeypatch.setattr(scheduler, "DAILY_REQUEST_BUDGET", 12)
+    guild_counts = {f"skin{i}": 1 for i in range(10)}
+
+    due = scheduler.select_due_hash_names(0, guild_counts, {})
+
+    assert len(due) == math.ceil(12 / scheduler.RUNS_PER_DAY)
+
+
+class FakeTable:
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def scan(self, **kwargs):
+        self.calls.append(kwargs)
+        page = len(self.calls) - 1
+        response = {"Items": self.pages[page]}
+        if page + 1 < len(self.pages):
+            response["LastEvaluatedKey"] = {"page": page}
+        return response
+
+
+def test_scan_all_items_follows_last_evaluated_key():
+    table = FakeTable([[{"n": 1}, {"n": 2}], [{"n": 3}]])
+
+    items = list(scheduler.scan_all_items(table, ProjectionExpression="n"))
+
+    assert items == [{"n": 1}, {"n": 2}, {"n": 3}]
+    assert "ExclusiveStartKey" not in table.calls[0]
+    assert table.calls[1]["ExclusiveStartKey"] == {"page": 0}
+
+
+def test_guild_counts_count_each_guild_once(monkeypatch):
+    scans = {
+        "tracked": [
+            {"guild_id": 1, "hash_name": "a"},
+            {"guild_id": 2, "hash_name": "a"},
+        ],
+        "portfolios": [
+            {"guild_id": 1, "hash_name": "a"},  # also tracked by guild 1
+            {"guild_id": 3, "hash_name": "a"},
+            {"guild_id": 1, "hash_name": "b"},
+        ],
+    }
+    monkeypatch.setattr(scheduler, "tracked_skins_table", "tracked")
+    monkeypatch.setattr(scheduler, "portfolios_table", "portfolios")
+    monkeypatch.setattr(
+        scheduler, "scan_all_items", lambda table, **kwargs: iter(scans[table])
+    )
+
+    assert scheduler.get_guild_counts() == {"a": 3, "b": 1}
+    assert list(scheduler.iter_tracked_hash_names()) == ["a", "b"]